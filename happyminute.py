@@ -1,4 +1,10 @@
 import requests
+import orjson
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import time
+import random
+import threading
 import datetime as dt
 from datetime import timedelta
 from google.oauth2.credentials import Credentials
@@ -9,7 +15,10 @@ import base64
 import streamlit as st
 import pytz
 import urllib.parse
-import difflib  # For smart suggestions
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from rapidfuzz import process, fuzz  # For smart suggestions
 
 # ------------------------------
 # Configuration and Initialization
@@ -33,12 +42,24 @@ st.write("Custom Built for Kerri Faber")
 SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets'
 ]
-gcp_secrets = st.secrets["gcp_service_account"]
-creds = service_account.Credentials.from_service_account_info(
-    gcp_secrets,
-    scopes=SCOPES
-)
-sheets_service = build('sheets', 'v4', credentials=creds)
+
+@st.cache_resource
+def get_google_credentials():
+    """
+    Loads the Google service account credentials once per process.
+
+    Caching the credentials object also caches its OAuth access token, so reruns skip the
+    key parse and token request. The Sheets client itself is rebuilt on each rerun because
+    its httplib2 transport is not thread-safe across concurrent sessions.
+    """
+    return service_account.Credentials.from_service_account_info(
+        st.secrets["gcp_service_account"],
+        scopes=SCOPES
+    )
+
+# The client is built from the discovery document bundled with googleapiclient (no network fetch)
+creds = get_google_credentials()
+sheets_service = build('sheets', 'v4', credentials=creds, cache_discovery=False, static_discovery=True)
 
 # ------------------------------
 # Define HubSpot Credentials and Headers
@@ -48,6 +69,79 @@ headers = {
     "Authorization": f"Bearer {HUBSPOT_API_TOKEN}",
     "Content-Type": "application/json"
 }
+HUBSPOT_MAX_RETRIES = 5  # Retries for rate-limited (429) requests
+HUBSPOT_BATCH_SIZE = 100  # Maximum inputs per HubSpot batch request
+HUBSPOT_NOTE_TO_CONTACT_TYPE_ID = 202
+HUBSPOT_REQUESTS_PER_SECOND = 10  # General portal rate limit every HubSpot call is paced to
+HUBSPOT_SEARCH_REQUESTS_PER_SECOND = 4  # Search calls, whose own per-account limit is 5 per second
+HUBSPOT_CONTACTS_FULL_SYNC_SECONDS = 3600  # Re-download every contact this often to drop deleted ones
+HUBSPOT_CONTACTS_SYNC_OVERLAP_MS = 60 * 1000  # Search index lag covered by each incremental sync
+
+# ------------------------------
+# Define Shared HTTP Session
+# ------------------------------
+
+@st.cache_resource
+def get_http_session():
+    """
+    Creates and caches a requests.Session shared by all HubSpot and Zoom calls.
+
+    Reusing pooled connections skips the DNS lookup and TLS handshake on every request.
+    Idempotent requests are retried on 5xx errors; HubSpot rate limiting (429) is
+    handled by hubspot_request, so it isn't retried here as well.
+    """
+    session = requests.Session()
+    retries = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[500, 502, 503, 504],
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retries)
+    session.mount("https://", adapter)
+    return session
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that refills at `rate` tokens per second up to `capacity`.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Takes one token, sleeping until one is available.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token now; if the bucket is empty, wait until it has refilled
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+@st.cache_resource
+def get_hubspot_rate_limiter():
+    """
+    Creates and caches the token bucket shared by every HubSpot call across sessions.
+    """
+    return TokenBucket(HUBSPOT_REQUESTS_PER_SECOND, HUBSPOT_REQUESTS_PER_SECOND)
+
+@st.cache_resource
+def get_hubspot_search_rate_limiter():
+    """
+    Creates and caches the token bucket shared by every HubSpot search call across sessions.
+
+    The bucket holds a single token, so even a burst of searches goes out at
+    HUBSPOT_SEARCH_REQUESTS_PER_SECOND and never reaches the search limit.
+    """
+    return TokenBucket(HUBSPOT_SEARCH_REQUESTS_PER_SECOND, 1)
 
 # ------------------------------
 # Define Google Drive Folder and Spreadsheet IDs
@@ -61,13 +155,46 @@ GD_SPREADSHEET_ID_INGRESS_LOG = st.secrets["gdrive"]["GD_SPREADSHEET_ID_INGRESS_
 GD_SHEET_NAME_INGRESS_LOG = 'happy_minute'
 GD_SHEET_NAME_SUMMARY_LOG = 'happy_minute_summary'
 
+ZOOM_MAX_WORKERS = 8  # Meeting instances whose participants are fetched concurrently
+
 # ------------------------------
 # HubSpot API Functions
 # ------------------------------
 
+def parse_json(response):
+    """
+    Parses a JSON response body with orjson, which is several times faster than the stdlib json module.
+    """
+    return orjson.loads(response.content)
+
+def hubspot_request(method, url, search=False, **kwargs):
+    """
+    Sends a request to the HubSpot API, retrying responses rejected by the rate limiter (429).
+
+    Requests are paced by the shared token bucket so bursts stay under the portal limit.
+    Search requests (search=True) are also paced by the slower search bucket.
+    Waits for the Retry-After header when HubSpot sends one, otherwise backs off exponentially,
+    plus up to one second of random jitter. The last response is returned either way.
+    """
+    if 'json' in kwargs:
+        # Serialize the body with orjson; headers already declare application/json
+        kwargs['data'] = orjson.dumps(kwargs.pop('json'))
+    for attempt in range(HUBSPOT_MAX_RETRIES + 1):
+        if search:
+            get_hubspot_search_rate_limiter().acquire()
+        get_hubspot_rate_limiter().acquire()
+        response = get_http_session().request(method, url, headers=headers, **kwargs)
+        if response.status_code != 429 or attempt == HUBSPOT_MAX_RETRIES:
+            return response
+        retry_after = response.headers.get('Retry-After', '')
+        delay = int(retry_after) if retry_after.isdigit() else 2 ** attempt
+        time.sleep(delay + random.random())
+
 def get_all_contacts():
     """
     Retrieves all contacts from the HubSpot CRM and returns them as a list of dictionaries.
+
+    Request errors are raised, so a partial list is never taken for the full contact list.
     """
     all_contacts = []
     after = None
@@ -76,45 +203,131 @@ def get_all_contacts():
         params = {'limit': 100, 'properties': 'firstname,lastname,email'}
         if after:
             params['after'] = after
-        try:
-            response = requests.get(url_contacts, headers=headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            all_contacts.extend(data.get('results', []))
-            paging = data.get('paging')
-            if paging and 'next' in paging:
-                after = paging['next']['after']
-            else:
-                break
-        except requests.exceptions.RequestException as e:
-            st.error(f"An error occurred while fetching contacts: {e}")
+        response = hubspot_request('GET', url_contacts, params=params)
+        response.raise_for_status()
+        data = parse_json(response)
+        all_contacts.extend(data.get('results', []))
+        paging = data.get('paging')
+        if paging and 'next' in paging:
+            after = paging['next']['after']
+        else:
             break
     return all_contacts
 
-def create_contact(firstname, lastname, email=None):
+def get_modified_contacts(since_ms):
     """
-    Creates a new contact in HubSpot with the given details.
+    Retrieves the contacts modified at or after the given time (milliseconds since epoch) through the contacts search endpoint.
     """
-    url = "https://api.hubapi.com/crm/v3/objects/contacts"
-    data = {
-        "properties": {
-            "firstname": firstname,
-            "lastname": lastname,
+    url = "https://api.hubapi.com/crm/v3/objects/contacts/search"
+    modified_contacts = []
+    after = None
+    while True:
+        data = {
+            "filterGroups": [
+                {"filters": [{"propertyName": "lastmodifieddate", "operator": "GTE", "value": str(since_ms)}]}
+            ],
+            "sorts": [{"propertyName": "lastmodifieddate", "direction": "ASCENDING"}],
+            "properties": ["firstname", "lastname", "email"],
+            "limit": 100
         }
-    }
-    if email:
-        data["properties"]["email"] = email
-    try:
-        response = requests.post(url, headers=headers, json=data)
+        if after:
+            data["after"] = after
+        response = hubspot_request('POST', url, search=True, json=data)
         response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as e:
-        st.error(f"An error occurred while creating the contact: {e}")
-        st.error(f"Response content: {e.response.text}")
-        return None
-    except Exception as e:
-        st.error(f"An unexpected error occurred while creating the contact: {e}")
-        return None
+        body = parse_json(response)
+        modified_contacts.extend(body.get('results', []))
+        after = body.get('paging', {}).get('next', {}).get('after')
+        if not after:
+            break
+    return modified_contacts
+
+@st.cache_resource
+def get_contact_mirror(token_hash):
+    """
+    Creates the in-process mirror of HubSpot contacts keyed by contact ID, shared across sessions.
+
+    The token hash is only part of the cache key, so a rotated API token starts a fresh mirror.
+    """
+    return {'contacts': {}, 'synced_ms': None, 'full_synced_at': None, 'lock': threading.Lock()}
+
+def get_synced_contacts(token_hash):
+    """
+    Returns all HubSpot contacts from the mirror after bringing it up to date.
+
+    The first call (and one every HUBSPOT_CONTACTS_FULL_SYNC_SECONDS) downloads every contact;
+    calls in between only fetch the contacts modified since the previous sync.
+    A failed full download raises and leaves the mirror as it was, so the next call retries it.
+    """
+    mirror = get_contact_mirror(token_hash)
+    with mirror['lock']:
+        now = time.time()
+        sync_started_ms = int(now * 1000)
+        if mirror['full_synced_at'] is None or now - mirror['full_synced_at'] > HUBSPOT_CONTACTS_FULL_SYNC_SECONDS:
+            mirror['contacts'] = {contact.get('id'): contact for contact in get_all_contacts()}
+            mirror['full_synced_at'] = now
+        else:
+            try:
+                for contact in get_modified_contacts(mirror['synced_ms'] - HUBSPOT_CONTACTS_SYNC_OVERLAP_MS):
+                    mirror['contacts'][contact.get('id')] = contact
+            except requests.exceptions.RequestException as e:
+                # Keep serving the mirror; the next call retries from the same point
+                st.error(f"An error occurred while syncing contacts: {e}")
+                return list(mirror['contacts'].values())
+        mirror['synced_ms'] = sync_started_ms
+        return list(mirror['contacts'].values())
+
+@st.cache_data(ttl=300, show_spinner=False)
+def search_candidates(name):
+    """
+    Searches HubSpot for contacts whose first or last name shares a token with the given name.
+
+    Sends one request to the contacts search endpoint instead of matching against the whole CRM.
+    Results are cached for five minutes per name. Errors are raised so that they aren't cached.
+    """
+    tokens = name.split()
+    if not tokens:
+        return []
+    url = "https://api.hubapi.com/crm/v3/objects/contacts/search"
+    data = {
+        # Separate filter groups are OR'ed together
+        "filterGroups": [
+            {"filters": [{"propertyName": "firstname", "operator": "CONTAINS_TOKEN", "value": tokens[0]}]},
+            {"filters": [{"propertyName": "lastname", "operator": "CONTAINS_TOKEN", "value": tokens[-1]}]}
+        ],
+        "properties": ["firstname", "lastname", "email"],
+        "limit": 100
+    }
+    response = hubspot_request('POST', url, search=True, json=data)
+    response.raise_for_status()
+    return parse_json(response).get('results', [])
+
+def create_contacts(names):
+    """
+    Creates new contacts in HubSpot from (firstname, lastname) tuples, up to HUBSPOT_BATCH_SIZE per request.
+
+    Returns the created contacts. HubSpot doesn't guarantee that results come back in input
+    order, so callers should match them up by name.
+    """
+    url = "https://api.hubapi.com/crm/v3/objects/contacts/batch/create"
+    created_contacts = []
+    for start in range(0, len(names), HUBSPOT_BATCH_SIZE):
+        chunk = names[start:start + HUBSPOT_BATCH_SIZE]
+        data = {
+            "inputs": [
+                {"properties": {"firstname": firstname, "lastname": lastname}}
+                for firstname, lastname in chunk
+            ]
+        }
+        try:
+            response = hubspot_request('POST', url, json=data)
+            response.raise_for_status()
+            created_contacts.extend(parse_json(response).get('results', []))
+        except requests.exceptions.HTTPError as e:
+            st.error(f"An error occurred while creating contacts: {e}")
+            st.error(f"Response content: {e.response.text}")
+        except Exception as e:
+            st.error(f"An unexpected error occurred while creating contacts: {e}")
+    return created_contacts
 
 def create_note_in_hubspot(note_body, hs_timestamp):
     """
@@ -128,63 +341,109 @@ def create_note_in_hubspot(note_body, hs_timestamp):
         }
     }
     try:
-        response = requests.post(url, headers=headers, json=data)
+        response = hubspot_request('POST', url, json=data)
         response.raise_for_status()
-        note = response.json()
+        note = parse_json(response)
         note_id = note.get('id')
         return note_id
     except Exception as e:
         st.error(f"Error creating note in HubSpot: {e}")
         return None
 
-def associate_note_with_contact(note_id, contact_id):
+def associate_note_with_contacts(note_id, contact_ids):
     """
-    Associates the created Note with specified contact.
+    Associates the created Note with the specified contacts, up to HUBSPOT_BATCH_SIZE per request.
+
+    Returns the contact IDs whose batch request failed. Individual association errors reported
+    in a multi-status response are shown but don't abort the rest of the batch.
     """
-    url = f"https://api.hubapi.com/crm/v3/objects/notes/{note_id}/associations/contacts/{contact_id}/note_to_contact"
-    try:
-        response = requests.put(url, headers=headers)
-        response.raise_for_status()
-        return True
-    except Exception as e:
-        st.error(f"Error associating note with contact ID {contact_id}: {e}")
-        return False
+    url = "https://api.hubapi.com/crm/v4/associations/notes/contacts/batch/create"
+    failed_contact_ids = []
+    for start in range(0, len(contact_ids), HUBSPOT_BATCH_SIZE):
+        chunk = contact_ids[start:start + HUBSPOT_BATCH_SIZE]
+        data = {
+            "inputs": [
+                {
+                    "from": {"id": note_id},
+                    "to": {"id": contact_id},
+                    "types": [{"associationCategory": "HUBSPOT_DEFINED", "associationTypeId": HUBSPOT_NOTE_TO_CONTACT_TYPE_ID}]
+                }
+                for contact_id in chunk
+            ]
+        }
+        try:
+            response = hubspot_request('POST', url, json=data)
+            response.raise_for_status()
+            for error in parse_json(response).get('errors', []):
+                st.error(f"Error associating note with a contact: {error.get('message')}")
+        except Exception as e:
+            st.error(f"Error associating note with contact IDs {', '.join(chunk)}: {e}")
+            failed_contact_ids.extend(chunk)
+    return failed_contact_ids
+
+def split_name(fullname):
+    """
+    Splits a full name into (firstname, lastname): the last word is the last name and everything before it the first name.
+    A single word is returned as the first name with an empty last name.
+    """
+    names = fullname.split()
+    if len(names) < 2:
+        return (names[0] if names else '', '')
+    return ' '.join(names[:-1]), names[-1]
+
+def build_contact_options(contacts_data):
+    """
+    Builds the selection options for contacts in a single pass, with "firstname lastname [ID]" as the key and ID as the value.
+    """
+    contact_options = {}
+    for contact in contacts_data:
+        properties = contact.get('properties') or {}
+        contact_id = contact.get('id')
+        contact_options[f"{properties.get('firstname', '')} {properties.get('lastname', '')} [{contact_id}]"] = contact_id
+    return contact_options
 
 # ------------------------------
 # Existing Functions (Adjusted as Needed)
 # ------------------------------
 
-def log_participants_to_google_sheet_with_new_columns(date, participants, sheets_service, spreadsheet_id, sheet_name):
-    rows = []
-    for participant in participants:
-        # Prepare each row with desired data
-        row = [
-            date.strftime('%Y-%m-%d'),                # Column A: Date
-            participant.get('name'),                  # Column B: Participant Name
-            participant.get('join_time'),             # Column C: Join Time
-            participant.get('contact_name'),          # Column E: HubSpot Contact Name
-            participant.get('contact_id'),            # Column F: HubSpot Contact ID
-            participant.get('new_contact_created')    # Column G: New Contact Created (Yes/No)
-        ]
-        rows.append(row)
-    
-    # Write rows to Google Sheets
-    try:
-        request = sheets_service.spreadsheets().values().append(
-            spreadsheetId=spreadsheet_id,
-            range=f'{sheet_name}!A:H',  # Specify columns A to H
-            valueInputOption='RAW',
-            insertDataOption='INSERT_ROWS',
-            body={'values': rows}
-        )
-        request.execute()
-        st.success("Logged participant data to the spreadsheet.")
-    except Exception as e:
-        st.error(f"Error writing to spreadsheet: {str(e)}")
+@st.cache_data(show_spinner=False)
+def get_sheet_ids(spreadsheet_id):
+    """
+    Returns the numeric sheet IDs of a spreadsheet keyed by sheet name, cached per spreadsheet.
+    """
+    response = sheets_service.spreadsheets().get(
+        spreadsheetId=spreadsheet_id,
+        fields='sheets(properties(sheetId,title))'
+    ).execute()
+    return {sheet['properties']['title']: sheet['properties']['sheetId'] for sheet in response.get('sheets', [])}
+
+def to_cell_data(value):
+    """
+    Converts a Python value into Sheets CellData, keeping it unparsed like valueInputOption='RAW'.
+    """
+    if value is None:
+        return {}
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+PARTICIPANT_ROW_FIELDS = itemgetter(
+    'name',                 # Column B: Participant Name
+    'join_time',            # Column C: Join Time
+    'contact_name',         # Column E: HubSpot Contact Name
+    'contact_id',           # Column F: HubSpot Contact ID
+    'new_contact_created'   # Column G: New Contact Created (Yes/No)
+)
 
-def log_event_to_google_sheet(date, raw_attendees, existing_contacts_linked, new_contacts_created, sheets_service, spreadsheet_id, sheet_name, description, retrospective):
+def build_participant_rows(date, participants):
+    # Column A: Date, formatted once for every row. By submit time every participant
+    # has all PARTICIPANT_ROW_FIELDS set (new_contact_created is filled in while creating contacts)
+    date_str = date.strftime('%Y-%m-%d')
+    return [[date_str, *PARTICIPANT_ROW_FIELDS(participant)] for participant in participants]
+
+def build_event_row(date, raw_attendees, existing_contacts_linked, new_contacts_created, description, retrospective):
     # Prepare the row data
-    row = [
+    return [
         date.strftime('%Y-%m-%d'),                    # Column A: Event Date
         ', '.join(raw_attendees),                     # Column B: Raw Attendees
         ', '.join(existing_contacts_linked),          # Column C: Existing HubSpot Profiles Linked
@@ -194,19 +453,34 @@ def log_event_to_google_sheet(date, raw_attendees, existing_contacts_linked, new
         description,
         retrospective
     ]
-    # Write the row to Google Sheets
+
+def log_rows_to_google_sheets(sheets_service, spreadsheet_id, rows_by_sheet_name):
+    """
+    Appends rows to several sheets of one spreadsheet in a single batchUpdate request.
+
+    Each sheet gets an appendCells request, which adds the rows after the last row with data,
+    the same as values.append with INSERT_ROWS.
+    """
     try:
-        request = sheets_service.spreadsheets().values().append(
+        sheet_ids = get_sheet_ids(spreadsheet_id)
+        requests_body = [
+            {
+                'appendCells': {
+                    'sheetId': sheet_ids[sheet_name],
+                    'rows': [{'values': [to_cell_data(value) for value in row]} for row in rows],
+                    'fields': 'userEnteredValue'
+                }
+            }
+            for sheet_name, rows in rows_by_sheet_name.items()
+        ]
+        sheets_service.spreadsheets().batchUpdate(
             spreadsheetId=spreadsheet_id,
-            range=f'{sheet_name}!A:F',  # Specify columns A to F
-            valueInputOption='RAW',
-            insertDataOption='INSERT_ROWS',
-            body={'values': [row]}
-        )
-        request.execute()
-        st.success("Logged event data to the event log.")
+            body={'requests': requests_body},
+            fields='spreadsheetId'  # The replies to appendCells carry nothing we use
+        ).execute()
+        st.success("Logged participant and event data to the spreadsheet.")
     except Exception as e:
-        st.error(f"Error writing to event log spreadsheet: {str(e)}")
+        st.error(f"Error writing to spreadsheet: {str(e)}")
 
 def get_zoom_access_token():
     # Retrieve credentials from st.secrets
@@ -227,11 +501,11 @@ def get_zoom_access_token():
     }
     
     # Make the POST request to get the access token
-    response = requests.post(url, headers=headers)
+    response = get_http_session().post(url, headers=headers)
     
     # Check if the request was successful
     if response.status_code == 200:
-        access_token = response.json().get("access_token")
+        access_token = parse_json(response).get("access_token")
         return access_token
     else:
         st.error(f"Failed to obtain access token: {response.status_code} - {response.text}")
@@ -242,9 +516,9 @@ def get_past_meeting_instances(access_token, meeting_id):
     headers = {
         "Authorization": f"Bearer {access_token}"
     }
-    response = requests.get(url, headers=headers)
+    response = get_http_session().get(url, headers=headers)
     if response.status_code == 200:
-        instances = response.json().get("meetings", [])
+        instances = parse_json(response).get("meetings", [])
         return instances
     else:
         st.error(f"Failed to get past meeting instances: {response.status_code} - {response.text}")
@@ -264,9 +538,9 @@ def get_meeting_participants(access_token, meeting_uuid):
     while True:
         if next_page_token:
             params['next_page_token'] = next_page_token
-        response = requests.get(url, headers=headers, params=params)
+        response = get_http_session().get(url, headers=headers, params=params)
         if response.status_code == 200:
-            data = response.json()
+            data = parse_json(response)
             participants.extend(data.get('participants', []))
             next_page_token = data.get('next_page_token', '')
             if not next_page_token:
@@ -302,10 +576,15 @@ def run_script():
         st.error("No past meeting instances found.")
         return None, None
     
+    # The instances endpoint has no date filter and returns the meeting's whole history, so skip
+    # instances from other days by their ISO date prefix before parsing any timestamps
+    window_dates = {start_time_utc.date().isoformat(), end_time_utc.date().isoformat()}
     target_instances = []
     for instance in all_instances:
         instance_start_time_str = instance.get('start_time')
-        instance_start_time = dt.datetime.strptime(instance_start_time_str, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=pytz.utc)
+        if instance_start_time_str[:10] not in window_dates:
+            continue
+        instance_start_time = dt.datetime.fromisoformat(instance_start_time_str.replace('Z', '+00:00'))
         if start_time_utc <= instance_start_time <= end_time_utc:
             target_instances.append(instance)
     
@@ -313,20 +592,29 @@ def run_script():
         st.error("No meeting instances found within the specified time window.")
         return None, None
     
-    # Gather all participants for target instances
+    # Gather all participants for target instances, fetching the instances concurrently
+    meeting_uuids_encoded = [urllib.parse.quote(instance.get('uuid'), safe='') for instance in target_instances]
+    with ThreadPoolExecutor(
+        max_workers=ZOOM_MAX_WORKERS,
+        initializer=add_script_run_ctx,
+        initargs=(None, get_script_run_ctx())  # Lets st.error work from the worker threads
+    ) as executor:
+        participants_by_instance = list(executor.map(
+            lambda meeting_uuid_encoded: get_meeting_participants(access_token, meeting_uuid_encoded),
+            meeting_uuids_encoded
+        ))
+
     participants_data = []
-    for target_instance in target_instances:
-        meeting_uuid = target_instance.get('uuid')
-        meeting_uuid_encoded = urllib.parse.quote(meeting_uuid, safe='')
-        participants = get_meeting_participants(access_token, meeting_uuid_encoded)
-    
+    for participants in participants_by_instance:
         for participant in participants:
             join_time_str = participant.get('join_time')
-            join_time = dt.datetime.strptime(join_time_str, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=pytz.utc)
+            join_time = dt.datetime.fromisoformat(join_time_str.replace('Z', '+00:00'))
             if start_time_utc <= join_time <= end_time_utc:
+                participant_name = participant.get('name') or ''
                 participant_data = {
                     'name': participant.get('name'),
-                    'join_time': join_time_str
+                    'join_time': join_time_str,
+                    'name_normalized': participant_name.casefold().strip()  # Matched against contact names
                 }
                 participants_data.append(participant_data)
     
@@ -351,6 +639,10 @@ def main():
         st.session_state['desired_date_friday'] = None
     if 'contacts_data' not in st.session_state:
         st.session_state['contacts_data'] = None
+    if 'contact_options' not in st.session_state:
+        st.session_state['contact_options'] = None
+    if 'contact_option_keys' not in st.session_state:
+        st.session_state['contact_option_keys'] = None
 
     if st.button("Click to log HM attendees"):
         participants_data, desired_date_friday = run_script()
@@ -360,124 +652,140 @@ def main():
         else:
             st.error("No participant data retrieved.")
     
-    # Fetch contacts from HubSpot
+    # Fetch contacts from HubSpot (synced into the shared mirror, then kept in this session)
     if st.session_state['participants_data'] and st.session_state['contacts_data'] is None:
         with st.spinner('Fetching contacts from HubSpot...'):
-            st.session_state['contacts_data'] = get_all_contacts()
+            try:
+                st.session_state['contacts_data'] = get_synced_contacts(hash(HUBSPOT_API_TOKEN))
+            except requests.exceptions.RequestException as e:
+                # contacts_data stays unset, so the next rerun tries the download again
+                st.error(f"An error occurred while fetching contacts: {e}")
+            else:
+                st.session_state['contact_options'] = build_contact_options(st.session_state['contacts_data'])
+                st.session_state['contact_option_keys'] = list(st.session_state['contact_options'])
     
     if st.session_state['participants_data']:
-        # Retrieve contacts data from session state
-        contacts_data = st.session_state['contacts_data']
-
-        # Create a dictionary for contacts with "firstname lastname [ID]" as the key and ID as the value
-        contact_options = {
-            f"{contact.get('properties', {}).get('firstname', '')} {contact.get('properties', {}).get('lastname', '')} [{contact.get('id')}]": contact.get('id')
-            for contact in contacts_data
-        }
-        # Also create a list of contact names for matching
-        contact_names_list = [f"{contact.get('properties', {}).get('firstname', '')} {contact.get('properties', {}).get('lastname', '')}" for contact in contacts_data]
-        contact_name_to_id = {f"{contact.get('properties', {}).get('firstname', '')} {contact.get('properties', {}).get('lastname', '')}": contact.get('id') for contact in contacts_data}
+        # Retrieve the contact options built when the contacts were fetched
+        # Both are unset when the contact download failed; the selections then offer no existing contacts
+        contact_options = st.session_state['contact_options'] or {}
+        contact_option_keys = st.session_state['contact_option_keys'] or []
 
         # Provide a disclaimer for duplicate names
         st.write("**Note:** If there are duplicate names in the selection lists, please refer to the contact ID in brackets to verify the correct contact in HubSpot.")
 
-        st.write("Please enter/select the full names for the participants:")
-        for idx, participant in enumerate(st.session_state['participants_data']):
-            participant_name = participant.get('name')
-            st.write(f"Original Name: {participant_name}")
-            key_prefix = f"participant_{idx}"
-
-            # Use an expander for each participant to keep the UI clean
-            with st.expander(f"Participant {idx+1}: {participant_name}"):
-                # Smart suggestion of existing contact
-                # Use difflib to find close matches
-                close_matches = difflib.get_close_matches(participant_name, contact_names_list, n=3, cutoff=0.6)
-                suggested_contact_options = [f"{name} [{contact_name_to_id[name]}]" for name in close_matches if name in contact_name_to_id]
-                # Option to select existing contact or create new
-                contact_selection = st.radio(
-                    f"Select an option for '{participant_name}':",
-                    options=["Select an existing contact", "Create new contact"],
-                    key=f"{key_prefix}_contact_option"
-                )
+        # Collect all selections in a form so widget changes don't rerun the page until submit
+        with st.form("hm_form"):
+            st.write("Please enter/select the full names for the participants:")
+            for idx, participant in enumerate(st.session_state['participants_data']):
+                participant_name = participant.get('name')
+                st.write(f"Original Name: {participant_name}")
+                key_prefix = f"participant_{idx}"
+
+                # Use an expander for each participant to keep the UI clean
+                with st.expander(f"Participant {idx+1}: {participant_name}"):
+                    # Smart suggestion of existing contact
+                    # Search HubSpot for candidates, then use RapidFuzz to find close matches among them
+                    try:
+                        candidates = search_candidates(participant_name)
+                    except requests.exceptions.RequestException as e:
+                        st.error(f"An error occurred while searching contacts: {e}")
+                        candidates = []
+                    candidate_name_to_id = {f"{contact.get('properties', {}).get('firstname', '')} {contact.get('properties', {}).get('lastname', '')}": contact.get('id') for contact in candidates}
+                    candidate_names = list(candidate_name_to_id)
+                    matches = process.extract(
+                        participant['name_normalized'],
+                        [name.casefold() for name in candidate_names],
+                        scorer=fuzz.WRatio,
+                        score_cutoff=60,
+                        limit=3
+                    )
+                    close_matches = [candidate_names[index] for _, _, index in matches]
+                    suggested_contact_ids = {f"{name} [{candidate_name_to_id[name]}]": candidate_name_to_id[name] for name in close_matches}
+                    suggested_contact_options = list(suggested_contact_ids)
 
-                if contact_selection == "Select an existing contact":
-                    # Select from existing contacts with suggestions
+                    # Select from existing contacts with suggestions first, or enter a name to create a new one.
+                    # Inside the form a choice can't reveal other widgets, so both are always shown
                     selected_contact = st.selectbox(
-                        "Choose a contact:",
-                        options=[""] + suggested_contact_options + list(set(contact_options.keys()) - set(suggested_contact_options)),
+                        f"Choose an existing contact for '{participant_name}':",
+                        options=[""] + suggested_contact_options + [key for key in contact_option_keys if key not in suggested_contact_ids],
                         key=f"{key_prefix}_existing_contact"
                     )
-                    if selected_contact:
-                        participant['contact_id'] = contact_options[selected_contact]
-                        participant['contact_name'] = selected_contact
-                        participant['new_contact_created'] = "No"
-                    else:
-                        participant['contact_id'] = None
-                        participant['contact_name'] = None
-                else:
-                    # Create new contact
                     new_contact_fullname = st.text_input(
-                        "Enter full name for new contact:",
+                        "Or enter full name for new contact:",
                         key=f"{key_prefix}_new_contact_name"
-                    )
-                    participant['new_contact_fullname'] = new_contact_fullname.strip()
-                    participant['contact_id'] = None  # Will be set upon creation
-                    participant['contact_name'] = new_contact_fullname.strip()
-                    participant['new_contact_created'] = "Yes"
-
-                # Handle descriptions and join times as before
-                if '[1]' in participant_name or '[2]' in participant_name:
-                    participant['join_time'] = 'N/A'
-                    participant['description'] = event_description
-                else:
-                    participant['description'] = ''
-
-        # --- Add Additional Contacts Section ---
-        st.header("Add Additional Contacts")
-        st.write("If there are additional contacts who attended but are not listed above, you can add them here.")
-
-        # Multiselect for existing contacts
-        additional_existing_contacts = st.multiselect(
-            'Select existing contacts to add:',
-            options=list(contact_options.keys()),
-            key='additional_existing_contacts'
-        )
-
-        # Text area for new contacts
-        st.write("Enter names of new contacts to create in HubSpot (one per line):")
-        additional_new_contacts_input = st.text_area(
-            'New contacts:',
-            key='additional_new_contacts_input'
-        )
-
-        # Prepare additional contacts data
-        st.session_state['additional_contacts_data'] = []
-        # Process existing contacts
-        for contact_name in additional_existing_contacts:
-            contact_id = contact_options[contact_name]
-            st.session_state['additional_contacts_data'].append({
-                'name': None,  # No original participant name
-                'join_time': None,
-                'description': '',
-                'contact_name': contact_name,
-                'contact_id': contact_id,
-                'new_contact_created': "No"
-            })
-        # Process new contacts
-        additional_new_contacts = [name.strip() for name in additional_new_contacts_input.strip().split('\n') if name.strip()]
-        for fullname in additional_new_contacts:
-            st.session_state['additional_contacts_data'].append({
-                'name': None,
-                'join_time': None,
-                'description': '',
-                'contact_name': fullname,
-                'new_contact_fullname': fullname,
-                'contact_id': None,  # Will be set upon creation
-                'new_contact_created': "Yes"
-            })
-
-        # Add a "Log to Spreadsheet" button
-        if st.button("Log to Spreadsheet and Link to HubSpot!"):
+                    ).strip()
+
+                    if new_contact_fullname:
+                        # Create new contact
+                        participant['new_contact_fullname'] = new_contact_fullname
+                        participant['contact_id'] = None  # Will be set upon creation
+                        participant['contact_name'] = new_contact_fullname
+                        participant['new_contact_created'] = "Yes"
+                    else:
+                        participant.pop('new_contact_fullname', None)
+                        participant['new_contact_created'] = "No"
+                        if selected_contact:
+                            participant['contact_id'] = suggested_contact_ids.get(selected_contact) or contact_options[selected_contact]
+                            participant['contact_name'] = selected_contact
+                        else:
+                            participant['contact_id'] = None
+                            participant['contact_name'] = None
+
+                    # Handle descriptions and join times as before
+                    if '[1]' in participant_name or '[2]' in participant_name:
+                        participant['join_time'] = 'N/A'
+                        participant['description'] = event_description
+                    else:
+                        participant['description'] = ''
+
+            # --- Add Additional Contacts Section ---
+            st.header("Add Additional Contacts")
+            st.write("If there are additional contacts who attended but are not listed above, you can add them here.")
+
+            # Multiselect for existing contacts
+            additional_existing_contacts = st.multiselect(
+                'Select existing contacts to add:',
+                options=contact_option_keys,
+                key='additional_existing_contacts'
+            )
+
+            # Text area for new contacts
+            st.write("Enter names of new contacts to create in HubSpot (one per line):")
+            additional_new_contacts_input = st.text_area(
+                'New contacts:',
+                key='additional_new_contacts_input'
+            )
+
+            # Prepare additional contacts data
+            st.session_state['additional_contacts_data'] = []
+            # Process existing contacts
+            for contact_name in additional_existing_contacts:
+                contact_id = contact_options[contact_name]
+                st.session_state['additional_contacts_data'].append({
+                    'name': None,  # No original participant name
+                    'join_time': None,
+                    'description': '',
+                    'contact_name': contact_name,
+                    'contact_id': contact_id,
+                    'new_contact_created': "No"
+                })
+            # Process new contacts
+            additional_new_contacts = [name.strip() for name in additional_new_contacts_input.strip().split('\n') if name.strip()]
+            for fullname in additional_new_contacts:
+                st.session_state['additional_contacts_data'].append({
+                    'name': None,
+                    'join_time': None,
+                    'description': '',
+                    'contact_name': fullname,
+                    'new_contact_fullname': fullname,
+                    'contact_id': None,  # Will be set upon creation
+                    'new_contact_created': "Yes"
+                })
+
+            # Add a "Log to Spreadsheet" button
+            submitted = st.form_submit_button("Log to Spreadsheet and Link to HubSpot!")
+
+        if submitted:
             # Retrieve the updated participants data from session state
             participants_data = st.session_state['participants_data']
             additional_contacts_data = st.session_state.get('additional_contacts_data', [])
@@ -486,22 +794,15 @@ def main():
             # Combine participants and additional contacts
             all_contacts_data = participants_data + additional_contacts_data
 
-            # Create new contacts in HubSpot if needed
+            # Collect the new contacts to create in HubSpot
+            new_contacts = []  # (participant, firstname, lastname)
             for participant in all_contacts_data:
                 if participant.get('new_contact_created') == "Yes":
                     fullname = participant.get('new_contact_fullname')
                     if fullname:
-                        names = fullname.strip().split()
-                        if len(names) >= 2:
-                            firstname = ' '.join(names[:-1])
-                            lastname = names[-1]
-                            contact_response = create_contact(firstname, lastname)
-                            if contact_response and 'id' in contact_response:
-                                contact_id = contact_response['id']
-                                participant['contact_id'] = contact_id
-                                participant['contact_name'] = f"{firstname} {lastname} [{contact_id}]"
-                            else:
-                                st.error(f"Failed to create contact: {fullname}")
+                        firstname, lastname = split_name(fullname)
+                        if lastname:
+                            new_contacts.append((participant, firstname, lastname))
                         else:
                             st.error(f"Invalid contact name format: '{fullname}'. Each contact must include at least a first name and a last name.")
                     else:
@@ -509,49 +810,68 @@ def main():
                 else:
                     participant['new_contact_created'] = "No"  # Ensure consistency
 
+            # Create them in batched requests, then match the created IDs back up by name
+            created_ids_by_name = {}
+            for contact in create_contacts([(firstname, lastname) for _, firstname, lastname in new_contacts]):
+                properties = contact.get('properties', {})
+                created_ids_by_name.setdefault((properties.get('firstname'), properties.get('lastname')), []).append(contact.get('id'))
+            for participant, firstname, lastname in new_contacts:
+                created_ids = created_ids_by_name.get((firstname, lastname))
+                if created_ids:
+                    contact_id = created_ids.pop(0)
+                    participant['contact_id'] = contact_id
+                    participant['contact_name'] = f"{firstname} {lastname} [{contact_id}]"
+                else:
+                    st.error(f"Failed to create contact: {participant.get('new_contact_fullname')}")
+
             # Now, create a note in HubSpot
             friday_date = desired_date_friday.date()
             note_body = f"<b>HAPPY MINUTE:</b> {friday_date}<br><b>Description:</b> {event_description}<br><b>Retrospective:</b> {event_retrospective}"
             hs_timestamp = int(dt.datetime.now().timestamp() * 1000)  # Current time in milliseconds
             note_id = create_note_in_hubspot(note_body, hs_timestamp)
 
-            if note_id:
-                # Associate note with each participant's contact
-                for participant in all_contacts_data:
-                    contact_id = participant.get('contact_id')
-                    if contact_id:
-                        success = associate_note_with_contact(note_id, contact_id)
-                        if not success:
-                            st.error(f"Failed to associate note with contact ID {contact_id}")
-            else:
+            if not note_id:
                 st.error("Failed to create note in HubSpot.")
 
-            # Update Google Sheets
-            log_participants_to_google_sheet_with_new_columns(
-                friday_date,
-                all_contacts_data,
-                sheets_service,
-                GD_SPREADSHEET_ID_INGRESS_LOG,
-                GD_SHEET_NAME_INGRESS_LOG
-            )
-
             # Prepare data for the secondary event log
             raw_attendees = [p.get('name') for p in participants_data if p.get('name')]
             existing_contacts_linked = [p.get('contact_name') for p in all_contacts_data if p.get('new_contact_created') == "No" and p.get('contact_name')]
             new_contacts_created = [p.get('contact_name') for p in all_contacts_data if p.get('new_contact_created') == "Yes" and p.get('contact_name')]
 
-            # Log to the secondary event log
-            log_event_to_google_sheet(
-                friday_date,
-                raw_attendees,
-                existing_contacts_linked,
-                new_contacts_created,
-                sheets_service,
-                GD_SPREADSHEET_ID_INGRESS_LOG,
-                GD_SHEET_NAME_SUMMARY_LOG, 
-                event_description, 
-                event_retrospective
-            )
+            # Associate the note and update Google Sheets at the same time; neither depends on the other
+            with ThreadPoolExecutor(
+                max_workers=2,
+                initializer=add_script_run_ctx,
+                initargs=(None, get_script_run_ctx())  # Lets st.success/st.error work from the worker threads
+            ) as executor:
+                association_future = None
+                if note_id:
+                    # Associate note with every participant's contact in batched requests
+                    contact_ids = list(dict.fromkeys(p.get('contact_id') for p in all_contacts_data if p.get('contact_id')))
+                    association_future = executor.submit(associate_note_with_contacts, note_id, contact_ids)
+
+                # Update Google Sheets: log the participants and the event summary in one request
+                sheets_future = executor.submit(
+                    log_rows_to_google_sheets,
+                    sheets_service,
+                    GD_SPREADSHEET_ID_INGRESS_LOG,
+                    {
+                        GD_SHEET_NAME_INGRESS_LOG: build_participant_rows(friday_date, all_contacts_data),
+                        GD_SHEET_NAME_SUMMARY_LOG: [build_event_row(
+                            friday_date,
+                            raw_attendees,
+                            existing_contacts_linked,
+                            new_contacts_created,
+                            event_description,
+                            event_retrospective
+                        )]
+                    }
+                )
+
+            sheets_future.result()
+            if association_future:
+                for contact_id in association_future.result():
+                    st.error(f"Failed to associate note with contact ID {contact_id}")
 
             st.success("All data logged successfully.")
 
@@ -562,7 +882,7 @@ def main():
             # Optionally, reset clean names
             for idx in range(len(participants_data)):
                 key_prefix = f"participant_{idx}"
-                keys_to_delete = [f"{key_prefix}_contact_option", f"{key_prefix}_existing_contact", f"{key_prefix}_new_contact_name"]
+                keys_to_delete = [f"{key_prefix}_existing_contact", f"{key_prefix}_new_contact_name"]
                 for key in keys_to_delete:
                     if key in st.session_state:
                         del st.session_state[key]
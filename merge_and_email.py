@@ -3,24 +3,25 @@ import logging
 import re
 import io
 import os
+import threading
+from urllib.parse import quote
 from datetime import datetime
 
 import streamlit as st
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
 
-import smtplib
-import ssl
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from email.message import EmailMessage
+from email.generator import BytesGenerator
+from email import policy
 
 from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
+from google.auth.transport.requests import Request, AuthorizedSession
 import base64
-import markdown
 
 # ------------------------------
 # Configuration and Initialization
@@ -62,14 +63,87 @@ SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets',
     'https://www.googleapis.com/auth/gmail.send'  # Added Gmail scope
 ]
-gcp_secrets = st.secrets["gcp_service_account"]
-creds = service_account.Credentials.from_service_account_info(
-    gcp_secrets,
-    scopes=SCOPES
-)
-drive_service = build('drive', 'v3', credentials=creds)
-docs_service = build('docs', 'v1', credentials=creds)
-sheets_service = build('sheets', 'v4', credentials=creds)
+
+SHEETS_API_URL = "https://sheets.googleapis.com/v4/spreadsheets"
+GMAIL_SEND_URL = "https://gmail.googleapis.com/gmail/v1/users/me/messages/send"
+HTTP_USER_AGENT = "nos-generate-report"
+
+@st.cache_resource
+def get_google_credentials():
+    """
+    Creates and caches the service account credentials used for every Sheets request.
+
+    The cached object keeps its access token between reruns.
+
+    Returns:
+        service_account.Credentials: The service account credentials.
+    """
+    return service_account.Credentials.from_service_account_info(
+        st.secrets["gcp_service_account"],
+        scopes=SCOPES
+    )
+
+creds = get_google_credentials()
+
+@st.cache_resource
+def get_http_adapter():
+    """
+    Creates and caches the connection pool shared by the Sheets and Gmail sessions.
+
+    Both authorized sessions mount this one adapter, so every Google API call on the page draws
+    from the same pool of kept-alive connections. Idempotent requests are retried on 5xx errors;
+    POSTs such as the Gmail send are not, so a retry can never send an email twice.
+    """
+    retries = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[500, 502, 503, 504],
+        raise_on_status=False
+    )
+    return HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+
+def configure_google_session(session):
+    """
+    Mounts the shared connection pool on an authorized session and sets its User-Agent.
+
+    Args:
+        session (AuthorizedSession): The session to configure.
+
+    Returns:
+        AuthorizedSession: The same session.
+    """
+    session.mount("https://", get_http_adapter())
+    session.headers['User-Agent'] = HTTP_USER_AGENT
+    return session
+
+@st.cache_resource
+def get_authorized_session():
+    """
+    Returns a pooled HTTP session authorized with the service account.
+
+    The Sheets REST API is called through this session directly, so no discovery-based client
+    is built, and the connection stays open across requests and reruns.
+    """
+    return configure_google_session(AuthorizedSession(creds))
+
+def sheets_request(method, path, **kwargs):
+    """
+    Sends a request to the Sheets REST API and returns the decoded JSON response.
+
+    Args:
+        method (str): The HTTP method.
+        path (str): The path below /v4/spreadsheets, starting with the spreadsheet ID.
+        **kwargs: Passed on to requests (params, json, ...).
+
+    Returns:
+        dict: The JSON response.
+
+    Raises:
+        requests.HTTPError: If the API returns an error status.
+    """
+    response = get_authorized_session().request(method, f"{SHEETS_API_URL}/{path}", **kwargs)
+    response.raise_for_status()
+    return response.json()
 
 # ------------------------------
 # Define Google Drive Folder and Spreadsheet IDs
@@ -92,77 +166,119 @@ MERGE_STATUS_TAG = 'merge_status_tag'
 MERGE_STATUS_TRANSCRIBE = 'merge_status_transcribe'
 SENT_FLAG_COLUMN = 'sent_flag'
 
+# Plain fields each report entry shows, with the value used when a column is missing
+REPORT_FIELD_DEFAULTS = {
+    'gd_transcript_file_id': '',
+    'transcript_title': 'Untitled Transcript',
+    'action_items': '',
+    'who_recorded': '',
+    'datetime_uploaded': '',
+}
+
+# Report entry title linked to its transcript in Google Drive
+LINKED_TITLE_TEMPLATE = "[{title}](https://drive.google.com/file/d/{file_id}/view?usp=sharing)"
+
+# Markdown for one report entry, filled in with str.format for each transcript
+REPORT_ENTRY_TEMPLATE = """
+### Transcript {number}: {title}
+
+**Who Recorded:** {who_recorded}  
+**Datetime Uploaded:** {datetime_uploaded}  
+
+**Existing Contacts Linked:** {contacts_linked}  
+**Existing Companies Linked:** {companies_linked}  
+**New Contacts Linked:** {contacts_created}  
+**New Companies Linked:** {companies_created}  
+
+**Action Items:**  
+{action_items}
+
+---
+"""
+
+# HubSpot profile URL prefixes by entity type; the entity ID is appended to the end
+HUBSPOT_PROFILE_URL_TEMPLATES = {
+    'contact': "https://app.hubspot.com/contacts/{portal_id}/contact/",
+    'company': "https://app.hubspot.com/contacts/{portal_id}/company/",
+}
+
+# Matches one 'Name [ID]' entity in the linked/created entity columns. The lookbehind only lets
+# a match start right after a delimiter, which keeps the scan linear on long bracket-free text;
+# the captured name keeps its trailing whitespace and is stripped when it is formatted.
+ENTITY_PATTERN = re.compile(r'(?<![^,\[\]])([^,\[\]]+)\[(\d+)\]')
+
 # ------------------------------
 # Define Helper Functions
 # ------------------------------
 
-def parse_entities(entities_str):
+def get_profile_url_prefix(entity_type, hubspot_portal_id):
     """
-    Parses a string of entities in the format 'Name [ID], Name [ID]' into a list of dictionaries.
+    Resolves the HubSpot profile URL prefix for an entity type; the entity ID is appended to it.
 
     Args:
-        entities_str (str): String representation of entities.
+        entity_type (str): 'contact' or 'company'.
+        hubspot_portal_id (str): HubSpot portal ID.
 
     Returns:
-        list of dict: List of entities with 'name' and 'id' keys.
+        str or None: The URL prefix, or None for unknown entity types (which link to '#').
     """
-    entities_list = []
-    if entities_str:
-        # Regex pattern to match 'Name [ID]'
-        pattern = r'([^,\[\]]+?)\s*\[(\d+)\]'
-        matches = re.findall(pattern, entities_str)
-        for match in matches:
-            name = match[0].strip()
-            entity_id = match[1].strip()
-            entities_list.append({'name': name, 'id': entity_id})
-    return entities_list
+    url_template = HUBSPOT_PROFILE_URL_TEMPLATES.get(entity_type)
+    return url_template.format(portal_id=hubspot_portal_id) if url_template else None
 
-def format_entities_with_links(entities_list, entity_type, hubspot_portal_id):
+def format_entity_columns(df, column_specs, hubspot_portal_id):
     """
-    Formats entities with embedded hyperlinks to their HubSpot profiles.
+    Parses and formats several columns of 'Name [ID], Name [ID]' strings at once.
+
+    The columns are stacked into one Series so the regex runs in a single pandas str.findall pass;
+    empty cells are skipped before matching.
 
     Args:
-        entities_list (list of dict): List of entities with 'name' and 'id'.
-        entity_type (str): 'contact' or 'company'.
+        df (pd.DataFrame): The report data.
+        column_specs (list of tuple): (column_name, entity_type, limit) per column. A missing column
+            formats as empty; limit keeps only the first limit entities of each row (None keeps all).
         hubspot_portal_id (str): HubSpot portal ID.
 
     Returns:
-        str: Formatted string with entities and hyperlinks.
-    """
-    formatted_entities = []
-    for entity in entities_list:
-        name = entity.get('name', '')
-        entity_id = entity.get('id', '')
-        if entity_id:
-            if entity_type == 'contact':
-                url = f"https://app.hubspot.com/contacts/{hubspot_portal_id}/contact/{entity_id}"
-            elif entity_type == 'company':
-                url = f"https://app.hubspot.com/contacts/{hubspot_portal_id}/company/{entity_id}"
-            else:
-                url = '#'
-            formatted_entities.append(f"[{name}]({url})")
-        else:
-            formatted_entities.append(name)
-    return ', '.join(formatted_entities)
-
-def download_sheet_as_df(spreadsheet_id, sheet_name):
+        list of list of str: The formatted entities with hyperlinks, one list per spec and one string per row.
+    """
+    row_count = len(df)
+    formatted = [[''] * row_count for _ in column_specs]
+    present = [(position, spec) for position, spec in enumerate(column_specs) if spec[0] in df.columns]
+    if not present or not row_count:
+        return formatted
+
+    stacked = pd.concat(
+        [df[column_name].fillna('').astype(str) for _, (column_name, _, _) in present],
+        ignore_index=True
+    )
+    matches = stacked[stacked != ''].str.findall(ENTITY_PATTERN)
+
+    # The URL prefix is the same for a whole column, so it is resolved once per column rather than per row.
+    # Every regex match carries a numeric ID, so each entity gets a link.
+    url_prefixes = [get_profile_url_prefix(entity_type, hubspot_portal_id) for _, (_, entity_type, _) in present]
+    for stacked_row, row_matches in matches.items():
+        block, row = divmod(stacked_row, row_count)
+        position, (_, _, limit) = present[block]
+        url_prefix = url_prefixes[block]
+        formatted[position][row] = ', '.join([
+            f"[{name.strip()}]({url_prefix + entity_id if url_prefix else '#'})"
+            for name, entity_id in row_matches[:limit]
+        ])
+    return formatted
+
+def values_to_df(values, sheet_name):
     """
-    Downloads a Google Sheet and returns it as a pandas DataFrame.
+    Converts the values of a Google Sheet (header row first) into a pandas DataFrame.
 
     Args:
-        spreadsheet_id (str): The ID of the Google Sheets document.
-        sheet_name (str): The name of the sheet to download.
+        values (list of list): The sheet values as returned by the Sheets API.
+        sheet_name (str): The name of the sheet, used in log messages.
 
     Returns:
         pd.DataFrame: The sheet data as a DataFrame.
     """
-    range_name = f"{sheet_name}!A:AY"  # Adjust columns as needed
-    result = sheets_service.spreadsheets().values().get(
-        spreadsheetId=spreadsheet_id, range=range_name
-    ).execute()
-    values = result.get('values', [])
     if not values:
-        logger.info(f"No data found in sheet {sheet_name}.")
+        logger.info("No data found in sheet %s.", sheet_name)
         return pd.DataFrame()  # Return empty DataFrame if no data
 
     # Convert the data to DataFrame
@@ -171,58 +287,93 @@ def download_sheet_as_df(spreadsheet_id, sheet_name):
 
     num_columns = len(headers)
 
-    # Ensure all rows have the same number of columns as headers
-    for i, row in enumerate(rows):
-        row_length = len(row)
-        if row_length != num_columns:
-            logger.warning(f"Row {i + 2} in sheet '{sheet_name}' has {row_length} columns; expected {num_columns}. Adjusting row.")
-            if row_length < num_columns:
-                # Pad the row with empty strings
-                rows[i] = row + [''] * (num_columns - row_length)
-            elif row_length > num_columns:
-                # Truncate the row to match headers
-                rows[i] = row[:num_columns]
-
-    df = pd.DataFrame(rows, columns=headers)
+    # The API omits trailing empty cells, so rows are ragged. Build the frame column-wise and
+    # pad/truncate it to the header width in one step instead of fixing each row in Python.
+    # Counting the ragged rows walks every row, so it only happens when debug logging is on
+    if logger.isEnabledFor(logging.DEBUG):
+        mismatched = sum(1 for row in rows if len(row) != num_columns)
+        logger.debug("%d row(s) in sheet '%s' do not have %d columns; adjusting.", mismatched, sheet_name, num_columns)
+
+    df = pd.DataFrame(rows).reindex(columns=range(num_columns)).fillna('')
+    df.columns = headers
     return df
 
-def get_sheet_id(spreadsheet_id, sheet_name):
+def batch_get_values(spreadsheet_id, ranges):
     """
-    Retrieves the sheet ID of a Google Sheet by its name.
+    Reads several ranges of a Google Sheets document in a single batchGet request.
 
     Args:
         spreadsheet_id (str): The ID of the Google Sheets document.
-        sheet_name (str): The name of the sheet.
+        ranges (list of str): The A1 ranges to read.
 
     Returns:
-        int: The sheet ID.
+        list of list: The values of each range, in the order of ranges.
     """
-    spreadsheet = sheets_service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
-    sheets = spreadsheet.get("sheets", [])
-    for sheet in sheets:
-        if sheet.get("properties", {}).get("title") == sheet_name:
-            return sheet.get("properties", {}).get("sheetId")
-    raise ValueError(f"Sheet '{sheet_name}' not found.")
+    result = sheets_request('GET', f"{spreadsheet_id}/values:batchGet", params={'ranges': ranges, 'fields': 'valueRanges(values)'})
+    value_ranges = result.get('valueRanges', [])
+    return [value_range.get('values', []) for value_range in value_ranges]
 
-def get_column_index(spreadsheet_id, sheet_name, column_name):
+def download_unsent_rows(spreadsheet_id, sheet_name, flag_column, unsent_value='0', headers=None):
     """
-    Retrieves the index of a column in a Google Sheet based on the column name.
+    Downloads only the rows of a Google Sheet whose flag column holds unsent_value.
+
+    The header row (unless the caller already has it) and the flag column are read first; the full
+    rows are then fetched with one batchGet, one range per run of consecutive matching rows. Rows
+    that were already sent never leave the Sheets server.
 
     Args:
         spreadsheet_id (str): The ID of the Google Sheets document.
-        sheet_name (str): The name of the sheet.
-        column_name (str): The name of the column.
+        sheet_name (str): The name of the sheet to download.
+        flag_column (str): The column used to flag sent rows.
+        unsent_value (str): The flag value of rows still to be sent.
+        headers (list of str, optional): The sheet's header row, if already known.
 
     Returns:
-        int: The column index (starting from 0), or None if not found.
+        pd.DataFrame: The matching rows, indexed by sheet row number - 2 (the position below the header).
     """
-    range_name = f"{sheet_name}!A1:1"
-    result = sheets_service.spreadsheets().values().get(
-        spreadsheetId=spreadsheet_id, range=range_name).execute()
-    headers = result.get('values', [[]])[0]
-    if column_name in headers:
-        return headers.index(column_name)
-    return None
+    if headers is None:
+        result = sheets_request(
+            'GET',
+            f"{spreadsheet_id}/values/{quote(f'{sheet_name}!1:1', safe='')}",
+            params={'fields': 'values'}
+        )
+        headers = result.get('values', [[]])[0]
+    if flag_column not in headers:
+        logger.info("No '%s' column found in sheet %s.", flag_column, sheet_name)
+        return pd.DataFrame(columns=headers)
+
+    # Read the flag column on its own to find the matching rows
+    flag_column_letter = column_index_to_letter(headers.index(flag_column))
+    result = sheets_request(
+        'GET',
+        f"{spreadsheet_id}/values/{quote(f'{sheet_name}!{flag_column_letter}2:{flag_column_letter}', safe='')}",
+        params={'majorDimension': 'COLUMNS', 'fields': 'values'}
+    )
+    flags = (result.get('values') or [[]])[0]
+    row_numbers = [row_number for row_number, flag in enumerate(flags, start=2) if flag == unsent_value]
+    if not row_numbers:
+        return pd.DataFrame(columns=headers)
+
+    # Fetch the full matching rows, one range per run of consecutive rows
+    last_column_letter = column_index_to_letter(len(headers) - 1)
+    runs = group_contiguous_rows(row_numbers)
+    result = sheets_request(
+        'GET',
+        f"{spreadsheet_id}/values:batchGet",
+        params={
+            'ranges': [f"{sheet_name}!A{first_row}:{last_column_letter}{last_row}" for first_row, last_row in runs],
+            'fields': 'valueRanges(values)'
+        }
+    )
+
+    rows = []
+    for (first_row, last_row), value_range in zip(runs, result.get('valueRanges', [])):
+        run_values = value_range.get('values', [])
+        # The API drops trailing empty rows and cells; pad each run back to its full shape
+        run_values += [[]] * (last_row - first_row + 1 - len(run_values))
+        rows.extend(row + [''] * (len(headers) - len(row)) for row in run_values)
+
+    return pd.DataFrame(rows, columns=headers, index=[row_number - 2 for row_number in row_numbers])
 
 def update_sheet(spreadsheet_id, sheet_name, df):
     """
@@ -239,152 +390,246 @@ def update_sheet(spreadsheet_id, sheet_name, df):
     body = {
         'values': values
     }
-    sheets_service.spreadsheets().values().update(
-        spreadsheetId=spreadsheet_id,
-        range=f"{sheet_name}!A1",
-        valueInputOption="RAW",
-        body=body
-    ).execute()
+    sheets_request(
+        'PUT',
+        f"{spreadsheet_id}/values/{quote(f'{sheet_name}!A1', safe='')}",
+        params={'valueInputOption': 'RAW'},
+        json=body
+    )
     st.write(f"Sheet '{sheet_name}' updated successfully.")
 
-def update_merge_statuses(spreadsheet_id, sheet_name, unique_id_column, unique_ids, flag_column):
+def update_header_row(spreadsheet_id, sheet_name, columns):
     """
-    Updates the merge status in a Google Sheet for specified rows.
+    Overwrites the header row of a Google Sheet, leaving the data rows untouched.
 
     Args:
         spreadsheet_id (str): The ID of the Google Sheets document.
         sheet_name (str): The name of the sheet to update.
-        unique_id_column (str): The column containing the unique ID.
-        unique_ids (list): List of unique IDs to mark as merged.
-        flag_column (str): The column used to flag merged rows.
+        columns (list of str): The column names to write into row 1.
     """
-    sheet_id = get_sheet_id(spreadsheet_id, sheet_name)
-    range_name = f"{sheet_name}!A:Z"
-    result = sheets_service.spreadsheets().values().get(
-        spreadsheetId=spreadsheet_id, range=range_name).execute()
-    values = result.get('values', [])
+    sheets_request(
+        'PUT',
+        f"{spreadsheet_id}/values/{quote(f'{sheet_name}!A1', safe='')}",
+        params={'valueInputOption': 'RAW'},
+        json={'values': [columns]}
+    )
 
-    if not values:
-        st.write(f"No data found in sheet {sheet_name} to update.")
+def append_rows_to_sheet(spreadsheet_id, sheet_name, df):
+    """
+    Appends the rows of a DataFrame below the existing data in a Google Sheet.
+
+    Only the new rows are uploaded. The DataFrame columns must already match the sheet's header order.
+
+    Args:
+        spreadsheet_id (str): The ID of the Google Sheets document.
+        sheet_name (str): The name of the sheet to append to.
+        df (pd.DataFrame): The rows to append.
+    """
+    sheets_request(
+        'POST',
+        f"{spreadsheet_id}/values/{quote(f'{sheet_name}!A1', safe='')}:append",
+        params={'valueInputOption': 'RAW', 'insertDataOption': 'INSERT_ROWS'},
+        json={'values': df.fillna('').values.tolist()}
+    )
+    st.write(f"Appended {len(df)} rows to sheet '{sheet_name}'.")
+
+def column_index_to_letter(column_index):
+    """
+    Converts a zero-based column index into its A1-notation column letter.
+
+    Args:
+        column_index (int): The column index (starting from 0).
+
+    Returns:
+        str: The column letter, e.g. 'A', 'Z' or 'AA'.
+    """
+    letters = ''
+    column_number = column_index + 1
+    while column_number:
+        column_number, remainder = divmod(column_number - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+def group_contiguous_rows(row_numbers):
+    """
+    Groups row numbers into runs of consecutive rows.
+
+    Args:
+        row_numbers (list of int): The row numbers to group.
+
+    Returns:
+        list of tuple: (first_row, last_row) for each run, in ascending order.
+    """
+    runs = []
+    for row_number in sorted(row_numbers):
+        if runs and row_number == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], row_number)
+        else:
+            runs.append((row_number, row_number))
+    return runs
+
+def flag_cell_ranges(sheet_name, flag_index, row_numbers):
+    """
+    Builds the value ranges that set a flag column to '1' on the given rows.
+
+    Consecutive rows are written as a single range, so a block of new rows costs one range.
+
+    Args:
+        sheet_name (str): The name of the sheet to update.
+        flag_index (int): The index of the flag column (starting from 0).
+        row_numbers (list of int): The sheet row numbers to flag (starting from 1, header included).
+
+    Returns:
+        list of dict: ValueRange entries for a values.batchUpdate request.
+    """
+    flag_column_letter = column_index_to_letter(flag_index)
+    return [
+        {
+            "range": f"{sheet_name}!{flag_column_letter}{first_row}:{flag_column_letter}{last_row}",
+            "values": [["1"]] * (last_row - first_row + 1)
+        }
+        for first_row, last_row in group_contiguous_rows(row_numbers)
+    ]
+
+def set_flag_cells(spreadsheet_id, data):
+    """
+    Writes flag ranges from flag_cell_ranges, for any number of sheets, with one values.batchUpdate call.
+
+    Args:
+        spreadsheet_id (str): The ID of the Google Sheets document.
+        data (list of dict): The ValueRange entries to write.
+    """
+    sheets_request(
+        'POST',
+        f"{spreadsheet_id}/values:batchUpdate",
+        json={"valueInputOption": "RAW", "data": data}
+    )
+
+def update_merge_statuses(spreadsheet_id, sheets, unique_id_column, unique_ids):
+    """
+    Updates the merge status in one or more Google Sheets for specified rows.
+
+    The sheets are not re-read: each DataFrame must be the one downloaded from its sheet, with rows in
+    sheet order. The flags for every sheet are written in a single values.batchUpdate call, and each
+    DataFrame is updated to match.
+
+    Args:
+        spreadsheet_id (str): The ID of the Google Sheets document.
+        sheets (list of tuple): (sheet_name, df, flag_column) for each sheet to update.
+        unique_id_column (str): The column containing the unique ID.
+        unique_ids (list-like): The unique IDs to mark as merged.
+    """
+    if not unique_ids:
+        st.write("No merge status updates needed.")
         return
 
-    headers = values[0]
-    rows = values[1:]
-    unique_id_index = headers.index(unique_id_column)
-    flag_index = headers.index(flag_column)
-
-    requests = []
-    for row_index, row in enumerate(rows, start=1):  # start=1 accounts for header row
-        if len(row) <= unique_id_index:
-            continue  # Skip rows without the unique_id
-        if row[unique_id_index] in unique_ids:
-            # Ensure the row has enough columns
-            while len(row) <= flag_index:
-                row.append('')
-            # Only update if the flag is not already '1'
-            if row[flag_index] != '1':
-                requests.append({
-                    "updateCells": {
-                        "range": {
-                            "sheetId": sheet_id,
-                            "startRowIndex": row_index,
-                            "endRowIndex": row_index + 1,
-                            "startColumnIndex": flag_index,
-                            "endColumnIndex": flag_index + 1,
-                        },
-                        "rows": [{
-                            "values": [{
-                                "userEnteredValue": {"stringValue": "1"}
-                            }]
-                        }],
-                        "fields": "userEnteredValue"
-                    }
-                })
-
-    if requests:
-        sheets_service.spreadsheets().batchUpdate(
-            spreadsheetId=spreadsheet_id,
-            body={"requests": requests}
-        ).execute()
-        st.write(f"Merge statuses updated in '{sheet_name}' for {len(requests)} rows.")
-    else:
-        st.write(f"No merge status updates needed in '{sheet_name}'.")
+    data = []
+    for sheet_name, df, flag_column in sheets:
+        if df.empty:
+            st.write(f"No data found in sheet {sheet_name} to update.")
+            continue
+
+        flag_index = df.columns.get_loc(flag_column)
+
+        # Hash-based membership test over the whole column; rows whose flag is already '1' need no update
+        mask = df[unique_id_column].isin(unique_ids) & (df[flag_column] != '1')
+        df.loc[mask, flag_column] = '1'
 
-def generate_markdown(report_data_list, hubspot_portal_id):
+        # + 2 accounts for the header row (A1 rows are 1-based)
+        rows_to_flag = (df.index[mask] + 2).tolist()
+
+        if rows_to_flag:
+            data.extend(flag_cell_ranges(sheet_name, flag_index, rows_to_flag))
+            st.write(f"Merge statuses updated in '{sheet_name}' for {len(rows_to_flag)} rows.")
+        else:
+            st.write(f"No merge status updates needed in '{sheet_name}'.")
+
+    if data:
+        set_flag_cells(spreadsheet_id, data)
+
+def generate_markdown(report_df, hubspot_portal_id):
     """
-    Generates markdown content from a list of report data dictionaries,
+    Generates markdown content from a DataFrame of report rows,
     embedding hyperlinks to HubSpot profiles for contacts and companies.
 
     Args:
-        report_data_list (list of dict): List of report data dictionaries.
+        report_df (pd.DataFrame): The report rows, one transcript per row.
         hubspot_portal_id (str): HubSpot portal ID.
 
     Returns:
         str: Markdown content.
     """
-    markdown_content = ""
+    markdown_blocks = []
     transcript_count = 1
 
-    for row in report_data_list:
+    # Parse and format every entity column in one regex pass before walking the rows
+    # Since who_recorded is a single person, only the first entry is linked
+    (
+        who_recorded_links,
+        contacts_linked_links,
+        companies_linked_links,
+        contacts_created_links,
+        companies_created_links
+    ) = format_entity_columns(report_df, [
+        ('who_recorded', 'contact', 1),
+        ('contacts_linked', 'contact', None),
+        ('companies_linked', 'company', None),
+        ('contacts_created', 'contact', None),
+        ('companies_created', 'company', None),
+    ], hubspot_portal_id)
+
+    # Select the plain fields in a fixed order, filling missing columns with their defaults
+    report_fields = report_df.reindex(columns=list(REPORT_FIELD_DEFAULTS)).fillna(REPORT_FIELD_DEFAULTS)
+
+    for fields, who_recorded_link, contacts_linked, companies_linked, contacts_created, companies_created in zip(
+        report_fields.itertuples(index=False, name=None),
+        who_recorded_links,
+        contacts_linked_links,
+        companies_linked_links,
+        contacts_created_links,
+        companies_created_links
+    ):
         # Extract necessary fields
-        file_id = row.get('gd_transcript_file_id', '')
-        transcript_title = row.get('transcript_title', 'Untitled Transcript')
-        action_items = row.get('action_items', '').replace('\n', '  \n')
-
-        # Extract who_recorded and datetime_uploaded
-        who_recorded_str = row.get('who_recorded', '')
-        datetime_uploaded = row.get('datetime_uploaded', '')
-
-        # Parse who_recorded into name and ID
-        who_recorded_list = parse_entities(who_recorded_str)
-        # Since who_recorded is a single person, get the first entry
-        if who_recorded_list:
-            who_recorded_link = format_entities_with_links([who_recorded_list[0]], 'contact', hubspot_portal_id)
-        else:
-            who_recorded_link = who_recorded_str  # If parsing fails, display the original string
+        file_id, transcript_title, action_items, who_recorded_str, datetime_uploaded = fields
+        action_items = action_items.replace('\n', '  \n')
 
-        # Extract contacts and companies data
-        contacts_linked = row.get('contacts_linked', '')
-        companies_linked = row.get('companies_linked', '')
-        contacts_created = row.get('contacts_created', '')
-        companies_created = row.get('companies_created', '')
-
-        # Parse the contacts and companies into lists of dicts
-        contacts_linked_list = parse_entities(contacts_linked)
-        companies_linked_list = parse_entities(companies_linked)
-        contacts_created_list = parse_entities(contacts_created)
-        companies_created_list = parse_entities(companies_created)
+        if not who_recorded_link:
+            who_recorded_link = who_recorded_str  # If parsing fails, display the original string
 
-        # Construct Google Drive link
+        # Link the title to the transcript in Google Drive; without a file ID it stays plain text
         if file_id:
-            drive_link = f"https://drive.google.com/file/d/{file_id}/view?usp=sharing"
+            title = LINKED_TITLE_TEMPLATE.format(title=transcript_title, file_id=file_id)
         else:
-            drive_link = "#"
+            title = transcript_title
 
         # Compile Markdown for the current transcript
-        markdown_content += f"""
-### Transcript {transcript_count}: [{transcript_title}]({drive_link})
-
-**Who Recorded:** {who_recorded_link}  
-**Datetime Uploaded:** {datetime_uploaded}  
-
-**Existing Contacts Linked:** {format_entities_with_links(contacts_linked_list, 'contact', hubspot_portal_id)}  
-**Existing Companies Linked:** {format_entities_with_links(companies_linked_list, 'company', hubspot_portal_id)}  
-**New Contacts Linked:** {format_entities_with_links(contacts_created_list, 'contact', hubspot_portal_id)}  
-**New Companies Linked:** {format_entities_with_links(companies_created_list, 'company', hubspot_portal_id)}  
-
-**Action Items:**  
-{action_items}
-
----
-"""
+        markdown_blocks.append(REPORT_ENTRY_TEMPLATE.format(
+            number=transcript_count,
+            title=title,
+            who_recorded=who_recorded_link,
+            datetime_uploaded=datetime_uploaded,
+            contacts_linked=contacts_linked,
+            companies_linked=companies_linked,
+            contacts_created=contacts_created,
+            companies_created=companies_created,
+            action_items=action_items
+        ))
         transcript_count += 1
 
-    return markdown_content.strip()
+    # Join the blocks once instead of re-copying the growing string for every transcript
+    return "".join(markdown_blocks).strip()
 
-def get_gmail_service():
+@st.cache_resource
+def get_gmail_credentials():
     """
-    Creates and returns a Gmail API service using OAuth2 credentials.
+    Creates and caches the OAuth2 credentials used by the Gmail API.
+
+    The credentials are shared across reruns and sessions; google-auth refreshes the
+    access token on its own once it expires, so the token exchange only happens once
+    per hour instead of on every send.
+
+    Returns:
+        Credentials: The refreshed Gmail OAuth2 credentials.
     """
     # Retrieve credentials from Streamlit secrets
     client_id = st.secrets["gmail"]["client_id"]
@@ -404,18 +649,58 @@ def get_gmail_service():
         scopes=SCOPES
     )
 
-    try:
-        # Refresh the access token if needed
-        creds.refresh(Request())
+    # Fetch the first access token up front so bad credentials fail here (and aren't cached)
+    creds.refresh(Request())
+    return creds
+
+@st.cache_resource
+def get_gmail_authorized_session():
+    """
+    Creates and caches the pooled session used for the Gmail REST API.
+    """
+    return configure_google_session(AuthorizedSession(get_gmail_credentials()))
 
-        # Build the Gmail service
-        service = build('gmail', 'v1', credentials=creds)
-        logger.info("Gmail service created successfully.")
-        return service
+def get_gmail_session():
+    """
+    Returns an HTTP session authorized with the cached Gmail OAuth2 credentials, or None on failure.
+    """
+    try:
+        session = get_gmail_authorized_session()
+        logger.info("Gmail session created successfully.")
+        return session
     except Exception as e:
-        logger.exception(f"Failed to create Gmail service: {e}")
+        logger.exception("Failed to create Gmail session: %s", e)
         return None
 
+@st.cache_resource
+def get_markdown_converter():
+    """
+    Creates and caches one Markdown converter, plus the lock that serializes its use.
+
+    Building a Markdown instance sets up its whole parser and extension registry, so it is done once
+    per process. An instance holds per-document state, so sessions take turns converting.
+
+    Returns:
+        tuple: The markdown.Markdown instance and its threading.Lock.
+    """
+    # Imported here so reruns that never send an email don't pay for loading markdown
+    import markdown
+    return markdown.Markdown(), threading.Lock()
+
+def markdown_to_html(markdown_content):
+    """
+    Converts Markdown to HTML with the cached converter.
+
+    Args:
+        markdown_content (str): The Markdown source.
+
+    Returns:
+        str: The rendered HTML.
+    """
+    converter, lock = get_markdown_converter()
+    with lock:
+        return converter.reset().convert(markdown_content)
+
 def create_message(sender, to, subject, markdown_content):
     """
     Creates a MIME message with both plain text and HTML parts from Markdown content.
@@ -431,36 +716,35 @@ def create_message(sender, to, subject, markdown_content):
     """
     try:
         # Convert Markdown to HTML
-        html_content = markdown.markdown(markdown_content)
+        html_content = markdown_to_html(markdown_content)
 
-        # Create a multipart message and set headers
-        message = MIMEMultipart("alternative")
+        # Create the message and set headers
+        message = EmailMessage(policy=policy.SMTP)
         message["Subject"] = subject
         message["From"] = sender
         message["To"] = to
 
-        # Attach the plain text and HTML versions of the email
-        part1 = MIMEText(markdown_content, "plain")
-        part2 = MIMEText(html_content, "html")
-
-        message.attach(part1)
-        message.attach(part2)
+        # Add the plain text version, then the HTML version as its alternative
+        message.set_content(markdown_content)
+        message.add_alternative(html_content, subtype="html")
 
-        # Encode the message in base64 URL-safe encoding
-        raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
+        # Serialize the message straight into a buffer and encode it in base64 URL-safe encoding
+        buffer = io.BytesIO()
+        BytesGenerator(buffer, policy=policy.SMTP).flatten(message)
+        raw_message = base64.urlsafe_b64encode(buffer.getbuffer()).decode('ascii')
 
         return {"raw": raw_message}
 
     except Exception as e:
-        logger.exception(f"Failed to create email message: {e}")
+        logger.exception("Failed to create email message: %s", e)
         return None
 
-def send_email_via_gmail_api(service, message):
+def send_email_via_gmail_api(session, message):
     """
     Sends an email using the Gmail API.
 
     Args:
-        service (googleapiclient.discovery.Resource): The Gmail API service instance.
+        session (AuthorizedSession): The session authorized for Gmail.
         message (dict): The encoded email message to send.
 
     Returns:
@@ -468,11 +752,13 @@ def send_email_via_gmail_api(service, message):
     """
     try:
         # Send the email
-        send_message = service.users().messages().send(userId="me", body=message).execute()
-        logger.info(f"Message Id: {send_message['id']} sent successfully.")
+        response = session.post(GMAIL_SEND_URL, json=message)
+        response.raise_for_status()
+        send_message = response.json()
+        logger.info("Message Id: %s sent successfully.", send_message['id'])
         return True
     except Exception as e:
-        logger.exception(f"Failed to send email: {e}")
+        logger.exception("Failed to send email: %s", e)
         return False
 
 def send_email(markdown_content, sender_email, receiver_email):
@@ -487,11 +773,11 @@ def send_email(markdown_content, sender_email, receiver_email):
     Returns:
         bool: True if email was sent successfully, False otherwise.
     """
-    # Initialize the Gmail service
-    gmail_service = get_gmail_service()
+    # Initialize the Gmail session
+    gmail_session = get_gmail_session()
 
-    if not gmail_service:
-        logger.error("Gmail service could not be created. Email not sent.")
+    if not gmail_session:
+        logger.error("Gmail session could not be created. Email not sent.")
         return False
 
     subject = f"NOS Transcripts Report - {datetime.now().strftime('%Y-%m-%d')}"
@@ -509,7 +795,7 @@ def send_email(markdown_content, sender_email, receiver_email):
         return False
 
     # Send the email
-    email_sent = send_email_via_gmail_api(gmail_service, email_message)
+    email_sent = send_email_via_gmail_api(gmail_session, email_message)
 
     if email_sent:
         logger.info("Email sent successfully!")
@@ -518,61 +804,68 @@ def send_email(markdown_content, sender_email, receiver_email):
         logger.error("Failed to send the email.")
         return False
 
-def send_emails(spreadsheet_id, merged_sheet_name):
+def send_emails(spreadsheet_id, merged_sheet_name, merged_columns=None):
     """
     Sends a single email containing all new entries in the merged_data sheet where sent_flag is '0'.
 
     Args:
         spreadsheet_id (str): The ID of the Google Sheets document.
         merged_sheet_name (str): The name of the merged_data sheet.
+        merged_columns (list of str, optional): The merged_data header row, if the caller already has it.
     """
     # Sender and receiver email addresses
     sender_email = st.secrets['email']['sender']
     receiver_email = st.secrets['email']['receiver']
 
-    # Step 1: Download merged_data sheet
-    merged_data_df = download_sheet_as_df(spreadsheet_id, merged_sheet_name)
-
-    if merged_data_df.empty:
-        st.write(f"No data found in sheet {merged_sheet_name}.")
-        return
-
-    # **Ensure 'sent_flag' column exists (should now always exist due to merging process)**
-    if SENT_FLAG_COLUMN not in merged_data_df.columns:
-        merged_data_df[SENT_FLAG_COLUMN] = ''
-
-    # Step 2: Filter rows where sent_flag is '0'
-    unsent_df = merged_data_df[merged_data_df[SENT_FLAG_COLUMN] == '0'].copy()
+    # Step 1 & 2: Download only the rows where sent_flag is '0'
+    unsent_df = download_unsent_rows(spreadsheet_id, merged_sheet_name, SENT_FLAG_COLUMN, headers=merged_columns)
 
     if unsent_df.empty:
         st.write("No new emails to send.")
         return
 
     # Step 3: Generate email content for all unsent entries
-    report_data_list = unsent_df.to_dict('records')
-    markdown_content = generate_markdown(report_data_list, hubspot_portal_id)
+    markdown_content = generate_markdown(unsent_df, hubspot_portal_id)
 
     # Send email
     email_sent = send_email(markdown_content, sender_email, receiver_email)
 
     if email_sent:
-        # Update sent_flag to '1' in the DataFrame for all sent entries
-        merged_data_df.loc[unsent_df.index, SENT_FLAG_COLUMN] = '1'
         st.success(f"Email sent for {len(unsent_df)} entries.")
+
+        # Step 4: Set sent_flag to '1' on just the sent rows (index + 2 is the sheet row below the header)
+        set_flag_cells(spreadsheet_id, flag_cell_ranges(
+            merged_sheet_name,
+            unsent_df.columns.get_loc(SENT_FLAG_COLUMN),
+            (unsent_df.index + 2).tolist()
+        ))
+        st.write(f"Sheet '{merged_sheet_name}' updated successfully.")
     else:
         st.write(f"Failed to send email.")
 
-    # Step 4: Update merged_data sheet with updated sent_flag
-    update_sheet(spreadsheet_id, merged_sheet_name, merged_data_df)
-
 def merge_data():
-    # Step 1: Download data from both sheets
-    df_tag = download_sheet_as_df(GD_SPREADSHEET_ID_INGRESS_LOG, GD_SHEET_NAME_INGRESS_LOG_TAG)
-    df_transcribe = download_sheet_as_df(GD_SPREADSHEET_ID_INGRESS_LOG, GD_SHEET_NAME_INGRESS_LOG_TRANSCRIBE)
+    """
+    Merges newly tagged and transcribed rows into the merged_data sheet and flags them as merged.
+
+    Returns:
+        list of str: The merged_data header row after the merge, for send_emails to reuse.
+    """
+    # Step 1: Download both source sheets and the merged_data header row in one request
+    tag_values, transcribe_values, merged_header_values = batch_get_values(
+        GD_SPREADSHEET_ID_INGRESS_LOG,
+        [
+            f"{GD_SHEET_NAME_INGRESS_LOG_TAG}!A:AY",  # Adjust columns as needed
+            f"{GD_SHEET_NAME_INGRESS_LOG_TRANSCRIBE}!A:AY",
+            f"{GD_SHEET_NAME_INGRESS_LOG_MERGED}!1:1",
+        ]
+    )
+    df_tag = values_to_df(tag_values, GD_SHEET_NAME_INGRESS_LOG_TAG)
+    df_transcribe = values_to_df(transcribe_values, GD_SHEET_NAME_INGRESS_LOG_TRANSCRIBE)
+    merged_columns = merged_header_values[0] if merged_header_values else []
 
     if df_tag.empty or df_transcribe.empty:
         st.write("No data to process.")
-        return
+        return merged_columns
 
     # Ensure merge_status columns exist
     if MERGE_STATUS_TAG not in df_tag.columns:
@@ -586,6 +879,7 @@ def merge_data():
 
     if merged_df.empty:
         st.write("No new data to merge.")
+        return merged_columns
     else:
         # Set merge_status columns to '1' in merged_df
         merged_df[MERGE_STATUS_TAG] = '1'
@@ -594,22 +888,36 @@ def merge_data():
         # **Add sent_flag column and set to '0' for new rows**
         merged_df[SENT_FLAG_COLUMN] = '0'
 
-        # Step 3: Download existing merged_data sheet
-        merged_data_existing = download_sheet_as_df(GD_SPREADSHEET_ID_INGRESS_LOG, GD_SHEET_NAME_INGRESS_LOG_MERGED)
-        if merged_data_existing.empty:
-            merged_data_combined = merged_df
+        # Step 3 & 4: Add the new rows to the merged_data sheet
+        if not merged_columns:
+            # Empty sheet: write the header row along with the data
+            update_sheet(GD_SPREADSHEET_ID_INGRESS_LOG, GD_SHEET_NAME_INGRESS_LOG_MERGED, merged_df)
+            merged_columns = merged_df.columns.tolist()
         else:
-            merged_data_combined = pd.concat([merged_data_existing, merged_df], ignore_index=True)
-
-        # Step 4: Update merged_data sheet
-        update_sheet(GD_SPREADSHEET_ID_INGRESS_LOG, GD_SHEET_NAME_INGRESS_LOG_MERGED, merged_data_combined)
+            new_columns = [column for column in merged_df.columns if column not in merged_columns]
+            if new_columns:
+                # New columns appeared in a source sheet: extend the header row before appending
+                merged_columns = merged_columns + new_columns
+                update_header_row(GD_SPREADSHEET_ID_INGRESS_LOG, GD_SHEET_NAME_INGRESS_LOG_MERGED, merged_columns)
+            # Upload only the new rows, in the sheet's column order
+            merged_df = merged_df.reindex(columns=merged_columns)
+            append_rows_to_sheet(GD_SPREADSHEET_ID_INGRESS_LOG, GD_SHEET_NAME_INGRESS_LOG_MERGED, merged_df)
 
         # Step 5: Update merge statuses in original sheets
-        unique_ids = merged_df[UNIQUE_ID_COLUMN].tolist()
-        update_merge_statuses(GD_SPREADSHEET_ID_INGRESS_LOG, GD_SHEET_NAME_INGRESS_LOG_TAG, UNIQUE_ID_COLUMN, unique_ids, MERGE_STATUS_TAG)
-        update_merge_statuses(GD_SPREADSHEET_ID_INGRESS_LOG, GD_SHEET_NAME_INGRESS_LOG_TRANSCRIBE, UNIQUE_ID_COLUMN, unique_ids, MERGE_STATUS_TRANSCRIBE)
+        # Deduplicate the IDs once; a transcript can match several rows
+        unique_ids = frozenset(merged_df[UNIQUE_ID_COLUMN].unique().tolist())
+        update_merge_statuses(
+            GD_SPREADSHEET_ID_INGRESS_LOG,
+            [
+                (GD_SHEET_NAME_INGRESS_LOG_TAG, df_tag, MERGE_STATUS_TAG),
+                (GD_SHEET_NAME_INGRESS_LOG_TRANSCRIBE, df_transcribe, MERGE_STATUS_TRANSCRIBE),
+            ],
+            UNIQUE_ID_COLUMN,
+            unique_ids
+        )
 
         st.success("Merging process completed.")
+        return merged_columns
 
 # ------------------------------
 # Main Function
@@ -619,8 +927,8 @@ st.write("**Click the button below to generate an email report for all recently
 st.write("⚠️ONLY CLICK THIS BUTTON WHEN YOU ARE DONE WITH YOUR FULL TAGGING SESSION!⚠️")
 
 if st.button('Generate Report'):
-    merge_data()
-    send_emails(GD_SPREADSHEET_ID_INGRESS_LOG, GD_SHEET_NAME_INGRESS_LOG_MERGED)
+    merged_columns = merge_data()
+    send_emails(GD_SPREADSHEET_ID_INGRESS_LOG, GD_SHEET_NAME_INGRESS_LOG_MERGED, merged_columns)
     st.write("Email sent. You can close this tab now.")
     st.stop()
 
@@ -26,10 +26,17 @@ import logging
 import re
 import io
 import os
+import time
+import random
+import functools
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
@@ -70,6 +77,11 @@ headers = {
     "Content-Type": "application/json"
 }
 
+HUBSPOT_MAX_RETRIES = 5  # Attempts per request after HubSpot rate-limits it (429)
+HUBSPOT_LIST_PAGE_SIZE = 100  # Largest page the CRM v3 list endpoints accept
+HUBSPOT_LIST_CACHE_TTL = 3600  # Seconds the full company and contact lists are shared across sessions
+HUBSPOT_BATCH_SIZE = 100  # Most inputs the CRM v3 batch endpoints accept per call
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -83,14 +95,39 @@ SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets',
     'https://www.googleapis.com/auth/gmail.send'  # Added Gmail scope
 ]
-gcp_secrets = st.secrets["gcp_service_account"]
-creds = service_account.Credentials.from_service_account_info(
-    gcp_secrets,
-    scopes=SCOPES
-)
-drive_service = build('drive', 'v3', credentials=creds)
-docs_service = build('docs', 'v1', credentials=creds)
-sheets_service = build('sheets', 'v4', credentials=creds)
+
+@st.cache_resource
+def get_google_credentials():
+    """
+    Loads the Google service account credentials once per process.
+
+    The cached credentials keep their OAuth access token between reruns. Clients built
+    from them are not cached because their httplib2 transport is not thread-safe.
+
+    Returns:
+        google.oauth2.service_account.Credentials: The service account credentials.
+    """
+    return service_account.Credentials.from_service_account_info(
+        st.secrets["gcp_service_account"],
+        scopes=SCOPES
+    )
+
+
+def get_sheets_service():
+    """
+    Builds a Sheets client from the bundled discovery document.
+
+    Only the submit path writes to the ingress log, so the client is built there
+    instead of on every rerun.
+
+    Returns:
+        googleapiclient.discovery.Resource: The Sheets v4 client.
+    """
+    return build('sheets', 'v4', credentials=creds, cache_discovery=False, static_discovery=True)
+
+
+creds = get_google_credentials()
+drive_service = build('drive', 'v3', credentials=creds, cache_discovery=False, static_discovery=True)
 
 # ------------------------------
 # Define Google Drive Folder and Spreadsheet IDs
@@ -107,38 +144,86 @@ GD_SHEET_NAME_INGRESS_LOG = 'tag_transcripts'
 # GD_SPREADSHEET_ID_INGRESS_LOG = st.secrets["gdrive"]["GD_SPREADSHEET_ID_INGRESS_LOG_TEST"]
 # GD_SHEET_NAME_INGRESS_LOG = 'tag_transcripts'
 
+# Every custom property the NOS pipeline writes on a transcript file
+# (set by transcribe_audio.py, then replaced by this script)
+TRANSCRIPT_PROPERTY_KEYS = frozenset({
+    'transcription_timestamp',
+    'upload_timestamp',
+    'duration_seconds',
+    'raw_audio_file_link',
+    'mp3_file_link',
+    'datetime_uploaded',
+    'datetime_transcribed',
+    'datetime_tagged',
+    'seconds_transcribed',
+    'gd_input_audio_file_link',
+    'gd_output_mp3_file_link',
+    'who_recorded_ids',
+    'file_title',
+})
+
+GD_METADATA_CACHE_TTL = 300  # Seconds a cached Drive metadata read stays valid
+
+# Matches the file ID in Google Drive file, Google Docs and Drive "open?id=" links
+GD_LINK_PATTERN = re.compile(
+    r'https://(?:drive\.google\.com/file/d/|docs\.google\.com/document/d/|drive\.google\.com/open\?id=)'
+    r'([a-zA-Z0-9_-]+)'
+)
+
+# Matches any run of whitespace, including newlines, in free-text notes
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
 # ------------------------------
-# Define Google Drive and HubSpot Functions
+# Define Caching Helpers
 # ------------------------------
 
-def gd_move_file_between_folders(file_id, target_folder_id):
+@st.cache_resource
+def get_metadata_cache():
+    """
+    Returns the process-wide store backing ttl_cache, so cached entries survive Streamlit reruns.
+
+    Returns:
+        dict: The cache store, keyed by function name and then by call arguments.
+    """
+    return {}
+
+def ttl_cache(ttl):
     """
-    Moves a file to a different Google Drive folder.
+    Caches a function's results for ttl seconds, keyed by its positional arguments.
+
+    Empty results (None, {}, []) are not cached, so failed or empty reads are retried.
+    The decorated function gains invalidate(*args), which drops a single entry.
 
     Parameters:
-        file_id (str): The ID of the file to move.
-        target_folder_id (str): The ID of the destination folder.
+        ttl (int): The number of seconds a cached result stays valid.
 
     Returns:
-        None
+        function: The decorator.
     """
-    try:
-        # Retrieve the existing parents to remove
-        file = drive_service.files().get(fileId=file_id, fields='parents').execute()
-        previous_parents = ",".join(file.get('parents'))
+    def decorator(function):
+        def get_store():
+            return get_metadata_cache().setdefault(function.__qualname__, {})
+
+        @functools.wraps(function)
+        def wrapper(*args):
+            store = get_store()
+            cached = store.get(args)
+            if cached is not None and time.monotonic() - cached[0] < ttl:
+                return cached[1]
+            value = function(*args)
+            if value:
+                store[args] = (time.monotonic(), value)
+            return value
+
+        wrapper.invalidate = lambda *args: get_store().pop(args, None)
+        return wrapper
+    return decorator
 
-        # Move the file to the new folder
-        drive_service.files().update(
-            fileId=file_id,
-            addParents=target_folder_id,
-            removeParents=previous_parents,
-            fields='id, parents'
-        ).execute()
-
-        print(f"File ID {file_id} moved to folder ID {target_folder_id}")
-    except Exception as e:
-        st.error(f"Error moving file {file_id}: {str(e)}")
+# ------------------------------
+# Define Google Drive and HubSpot Functions
+# ------------------------------
 
+@functools.lru_cache(maxsize=128)
 def gd_extract_file_id(drive_link):
     """
     Extracts the file ID from a Google Drive or Google Docs link.
@@ -147,22 +232,12 @@ def gd_extract_file_id(drive_link):
         drive_link (str): The raw URL.
 
     Returns:
-        str: The Google Drive file ID.
-    """
-    # Regular expressions to extract the file ID from different Google URLs
-    patterns = [
-        r'https://drive\.google\.com/file/d/([a-zA-Z0-9_-]+)',
-        r'https://docs\.google\.com/document/d/([a-zA-Z0-9_-]+)',
-        r'https://drive\.google\.com/open\?id=([a-zA-Z0-9_-]+)'
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, drive_link)
-        if match:
-            return match.group(1)
-    else:
-        st.error("Invalid Google Drive or Google Docs link.")
-        return None
+        str: The Google Drive file ID, or None if the link is not recognized.
+    """
+    match = GD_LINK_PATTERN.search(drive_link)
+    return match.group(1) if match else None
 
+@ttl_cache(GD_METADATA_CACHE_TTL)
 def gd_get_file_properties(file_id):
     """
     Retrieves the properties of a file from Google Drive.
@@ -181,116 +256,249 @@ def gd_get_file_properties(file_id):
         st.error(f"Error fetching file properties: {e}")
         return {}
 
-def gd_update_file_properties(file_id, new_properties):
+def gd_finalize_file(file_id, new_name=None, target_folder_id=None, new_properties=None, known_keys=None):
     """
-    Clears all existing properties of a file in Google Drive and sets new properties.
+    Renames a file, moves it to another folder and replaces its properties in a single update.
 
     Parameters:
         file_id (str): The ID of the file.
-        new_properties (dict): A dictionary of new properties to set.
+        new_name (str, optional): The new name for the file. The name is kept if omitted.
+        target_folder_id (str, optional): The ID of the destination folder. The file stays put if omitted.
+        new_properties (dict, optional): A dictionary of new properties to set. Properties are kept if omitted.
+        known_keys (set, optional): The property keys to clear before setting new_properties.
 
     Returns:
         dict: The updated file resource.
     """
     try:
-        # Step 1: Retrieve existing properties
-        file = drive_service.files().get(fileId=file_id, fields='properties').execute()
-        existing_properties = file.get('properties', {})
-
-        # Step 2: Prepare properties to delete (set their values to None)
-        properties_to_delete = {key: None for key in existing_properties.keys()}
-
-        # Step 3: Combine properties to delete with new properties
-        update_properties = {**properties_to_delete, **new_properties}
+        file_metadata = {}
+        if new_name is not None:
+            file_metadata['name'] = new_name
+        if new_properties is not None:
+            properties_to_delete = {key: None for key in (known_keys or ())}
+            file_metadata['properties'] = {**properties_to_delete, **new_properties}
+
+        move_parameters = {}
+        if target_folder_id is not None:
+            # Retrieve the existing parents to remove
+            file = drive_service.files().get(fileId=file_id, fields='parents').execute()
+            move_parameters = {
+                'addParents': target_folder_id,
+                'removeParents': ",".join(file.get('parents')),
+            }
 
-        # Step 4: Update the file properties
-        file_metadata = {
-            'properties': update_properties
-        }
         updated_file = drive_service.files().update(
             fileId=file_id,
             body=file_metadata,
-            fields='id, properties'
+            fields='id, properties',  # Only the properties are shown afterwards
+            **move_parameters
         ).execute()
+        gd_get_file_properties.invalidate(file_id)
         return updated_file
     except Exception as e:
-        st.error(f"Error updating file properties: {e}")
+        st.error(f"Error finalizing file {file_id}: {str(e)}")
         return {}
 
-def gd_rename_file(file_id, new_name):
+@st.cache_resource
+def get_http_session():
     """
-    Renames a file in Google Drive.
-
-    Parameters:
-        file_id (str): The ID of the file to rename.
-        new_name (str): The new name for the file.
+    Creates and caches a requests.Session shared by all HubSpot calls.
 
-    Returns:
-        dict: The updated file resource.
+    Reusing pooled connections skips the DNS lookup and TLS handshake on every request.
+    The session carries the HubSpot auth headers, so callers don't pass them per request.
+    Idempotent requests are retried on 5xx errors; HubSpot rate limiting (429) is
+    handled by hubspot_request, so it isn't retried here as well.
     """
-    try:
-        file_metadata = {'name': new_name}
-        updated_file = drive_service.files().update(
-            fileId=file_id,
-            body=file_metadata,
-            fields='id, name'
-        ).execute()
-        return updated_file
-    except Exception as e:
-        st.error(f"Error renaming file: {e}")
-        return None
+    session = requests.Session()
+    session.headers.update(headers)
+    retries = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[500, 502, 503, 504],
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+    session.mount("https://", adapter)
+    return session
+
+def hubspot_request(method, url, **kwargs):
+    """
+    Sends a request to the HubSpot API, retrying responses rejected by the rate limiter (429).
 
-def get_all_companies():
+    Waits for the Retry-After header when HubSpot sends one, otherwise backs off exponentially,
+    plus up to one second of random jitter. The last response is returned either way.
     """
-    Retrieves all companies from the HubSpot CRM and returns them as a list of dictionaries.
+    for attempt in range(HUBSPOT_MAX_RETRIES + 1):
+        response = get_http_session().request(method, url, **kwargs)
+        if response.status_code != 429 or attempt == HUBSPOT_MAX_RETRIES:
+            return response
+        retry_after = response.headers.get('Retry-After', '')
+        delay = int(retry_after) if retry_after.isdigit() else 2 ** attempt
+        time.sleep(delay + random.random())
+
+def iter_hubspot_objects(object_type, properties):
+    """
+    Pages through every object of a type in the HubSpot CRM, yielding each one as a compact tuple.
+
+    Only the object ID and the requested property values are kept, so the bulky API records
+    (timestamps, archived flags, ...) are dropped page by page instead of piling up.
+
+    Parameters:
+        object_type (str): 'companies' or 'contacts'.
+        properties (list of str): The properties to request and yield, in order.
+
+    Yields:
+        tuple: The object ID followed by the value of each property ('' when unset).
     """
-    all_companies = []
     after = None
-    url_companies = "https://api.hubapi.com/crm/v3/objects/companies"
+    url = f"https://api.hubapi.com/crm/v3/objects/{object_type}"
     while True:
-        params = {'limit': 100, 'properties': 'name'}
+        params = {'limit': HUBSPOT_LIST_PAGE_SIZE, 'properties': ','.join(properties)}
         if after:
             params['after'] = after
-        try:
-            response = requests.get(url_companies, headers=headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            all_companies.extend(data.get('results', []))
-            paging = data.get('paging')
-            if paging and 'next' in paging:
-                after = paging['next']['after']
-            else:
-                break
-        except requests.exceptions.RequestException as e:
-            st.error(f"An error occurred while fetching companies: {e}")
+        response = hubspot_request('GET', url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        for record in data.get('results', []):
+            record_properties = record.get('properties') or {}
+            yield (record.get('id'), *(record_properties.get(name) or '' for name in properties))
+        paging = data.get('paging')
+        if paging and 'next' in paging:
+            after = paging['next']['after']
+        else:
             break
-    return all_companies
 
+@st.cache_data(ttl=HUBSPOT_LIST_CACHE_TTL, show_spinner=False)
+def get_all_companies():
+    """
+    Retrieves all companies from the HubSpot CRM as (id, name) tuples.
+
+    The list is cached for every session. Request errors are raised, so a partial list is never cached.
+    """
+    return list(iter_hubspot_objects('companies', ['name']))
+
+@st.cache_data(ttl=HUBSPOT_LIST_CACHE_TTL, show_spinner=False)
 def get_all_contacts():
     """
-    Retrieves all contacts from the HubSpot CRM and returns them as a list of dictionaries.
+    Retrieves all contacts from the HubSpot CRM as (id, firstname, lastname) tuples.
+
+    Only the properties the selection lists display are kept. The list is cached for every
+    session. Request errors are raised, so a partial list is never cached.
     """
-    all_contacts = []
-    after = None
-    url_contacts = "https://api.hubapi.com/crm/v3/objects/contacts"
-    while True:
-        params = {'limit': 100, 'properties': 'firstname,lastname,email'}
-        if after:
-            params['after'] = after
+    return list(iter_hubspot_objects('contacts', ['firstname', 'lastname']))
+
+@st.cache_resource(ttl=HUBSPOT_LIST_CACHE_TTL, show_spinner=False)
+def get_company_options():
+    """
+    Builds the company selection labels and the name index from the cached company list.
+
+    The result is derived once per list load and shared by every session and rerun without copying,
+    so callers must not modify it. Request errors are raised, so an empty result is never cached.
+
+    Returns:
+        tuple: Company IDs keyed by "name [ID]" label, and company IDs keyed by normalized name.
+            The first company wins when several share a name.
+    """
+    company_options = {}
+    company_ids_by_name = {}
+    for company_id, name in get_all_companies():
+        company_options[f"{name or 'Unnamed Company'} [{company_id}]"] = company_id
+        company_ids_by_name.setdefault(normalize_name(name), company_id)
+    return company_options, company_ids_by_name
+
+@st.cache_resource(ttl=HUBSPOT_LIST_CACHE_TTL, show_spinner=False)
+def get_contact_options():
+    """
+    Builds the contact selection labels and the name index from the cached contact list.
+
+    The result is derived once per list load and shared by every session and rerun without copying,
+    so callers must not modify it. Request errors are raised, so an empty result is never cached.
+
+    Returns:
+        tuple: Contact IDs keyed by "firstname lastname [ID]" label, and contact IDs keyed by
+            normalized full name. The first contact wins when several share a name.
+    """
+    contact_options = {}
+    contact_ids_by_name = {}
+    for contact_id, firstname, lastname in get_all_contacts():
+        full_name = f"{firstname} {lastname}"
+        contact_options[f"{full_name} [{contact_id}]"] = contact_id
+        contact_ids_by_name.setdefault(normalize_name(full_name), contact_id)
+    return contact_options, contact_ids_by_name
+
+def get_company_and_contact_options():
+    """
+    Retrieves the company and contact selection data, loading both lists from HubSpot at the same time.
+
+    Each list is paged with its own cursor, so the two page chains run on separate threads.
+    A list that fails to load is reported and returned empty.
+
+    Returns:
+        tuple: The company (options, ids_by_name) pair and the contact (options, ids_by_name) pair.
+    """
+    with ThreadPoolExecutor(
+        max_workers=2,
+        initializer=add_script_run_ctx,
+        initargs=(None, get_script_run_ctx())
+    ) as executor:
+        companies_future = executor.submit(get_company_options)
+        contacts_future = executor.submit(get_contact_options)
+
+    results = []
+    for kind, future in (('companies', companies_future), ('contacts', contacts_future)):
         try:
-            response = requests.get(url_contacts, headers=headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            all_contacts.extend(data.get('results', []))
-            paging = data.get('paging')
-            if paging and 'next' in paging:
-                after = paging['next']['after']
-            else:
-                break
+            results.append(future.result())
         except requests.exceptions.RequestException as e:
-            st.error(f"An error occurred while fetching contacts: {e}")
-            break
-    return all_contacts
+            st.error(f"An error occurred while fetching {kind}: {e}")
+            results.append(({}, {}))
+    return tuple(results)
+
+def run_concurrently(*tasks):
+    """
+    Runs independent HubSpot calls on separate threads and waits for all of them.
+
+    The threads get the script run context, so the calls can report problems with st.error.
+
+    Parameters:
+        *tasks (tuple): A function followed by its positional arguments, per call.
+
+    Returns:
+        list: The return value of each call, in the order of tasks.
+    """
+    with ThreadPoolExecutor(
+        max_workers=len(tasks),
+        initializer=add_script_run_ctx,
+        initargs=(None, get_script_run_ctx())
+    ) as executor:
+        futures = [executor.submit(function, *args) for function, *args in tasks]
+    return [future.result() for future in futures]
+
+def normalize_name(name):
+    """
+    Normalizes a company or contact name for duplicate checks: single spaces, lower case.
+    """
+    return ' '.join((name or '').split()).lower()
+
+def clear_company_cache():
+    """
+    Drops the cached company list and the options derived from it.
+    """
+    get_all_companies.clear()
+    get_company_options.clear()
+
+def clear_contact_cache():
+    """
+    Drops the cached contact list and the options derived from it.
+    """
+    get_all_contacts.clear()
+    get_contact_options.clear()
+
+def clear_hubspot_lists():
+    """
+    Drops the cached company and contact lists so the next load refetches them from HubSpot.
+    """
+    clear_company_cache()
+    clear_contact_cache()
 
 def create_note(note_body, hs_timestamp):
     """
@@ -312,7 +520,7 @@ def create_note(note_body, hs_timestamp):
         }
     }
     try:
-        response = requests.post(url, headers=headers, json=data)
+        response = hubspot_request('POST', url, json=data)
         response.raise_for_status()
         note = response.json()
         note_id = note.get('id')
@@ -325,14 +533,14 @@ def create_note(note_body, hs_timestamp):
         st.error(f"An unexpected error occurred while creating the note: {e}")
         return None
 
-def associate_note_with_objects(note_id, company_ids, contact_ids):
+def associate_note_with_type(note_id, to_object_type, object_ids):
     """
-    Associates the created Note with specified companies and contacts.
+    Associates the created Note with objects of one type, in batches of up to 100.
 
     Parameters:
         note_id (str): The ID of the created note.
-        company_ids (list): List of company IDs to associate.
-        contact_ids (list): List of contact IDs to associate.
+        to_object_type (str): 'companies' or 'contacts'.
+        object_ids (list): List of object IDs to associate.
 
     Returns:
         bool: True if associations were successful, False otherwise.
@@ -344,119 +552,121 @@ def associate_note_with_objects(note_id, company_ids, contact_ids):
 
     success = True
 
-    for company_id in company_ids:
-        url = f"https://api.hubapi.com/crm/v3/objects/notes/{note_id}/associations/companies/{company_id}/{association_types['companies']}"
-        try:
-            response = requests.put(url, headers=headers)
-            response.raise_for_status()
-        except requests.exceptions.HTTPError as e:
-            st.error(f"Error associating company ID {company_id} with note: {e}")
-            st.error(f"Response content: {e.response.text}")
-            success = False
-        except Exception as e:
-            st.error(f"Unexpected error while associating company ID {company_id}: {e}")
-            success = False
-
-    for contact_id in contact_ids:
-        url = f"https://api.hubapi.com/crm/v3/objects/notes/{note_id}/associations/contacts/{contact_id}/{association_types['contacts']}"
+    url = f"https://api.hubapi.com/crm/v3/associations/notes/{to_object_type}/batch/create"
+    for start in range(0, len(object_ids), HUBSPOT_BATCH_SIZE):
+        batch_ids = object_ids[start:start + HUBSPOT_BATCH_SIZE]
+        data = {
+            "inputs": [
+                {"from": {"id": note_id}, "to": {"id": object_id}, "type": association_types[to_object_type]}
+                for object_id in batch_ids
+            ]
+        }
         try:
-            response = requests.put(url, headers=headers)
+            response = hubspot_request('POST', url, json=data)
             response.raise_for_status()
+            # A partly failed batch still returns 2xx (207 Multi-Status) and lists the failures
+            for error in response.json().get('errors', []):
+                st.error(f"Error associating {to_object_type} with note: {error.get('message', error)}")
+                success = False
         except requests.exceptions.HTTPError as e:
-            st.error(f"Error associating contact ID {contact_id} with note: {e}")
+            st.error(f"Error associating {to_object_type} IDs {', '.join(map(str, batch_ids))} with note: {e}")
             st.error(f"Response content: {e.response.text}")
             success = False
         except Exception as e:
-            st.error(f"Unexpected error while associating contact ID {contact_id}: {e}")
+            st.error(f"Unexpected error while associating {to_object_type} IDs {', '.join(map(str, batch_ids))}: {e}")
             success = False
 
     return success
 
-def create_company(name):
+def associate_note_with_objects(note_id, company_ids, contact_ids):
     """
-    Creates a new company in HubSpot with the given name.
+    Associates the created Note with specified companies and contacts.
+
+    The company and contact associations are independent, so both are sent at the same time.
+
+    Parameters:
+        note_id (str): The ID of the created note.
+        company_ids (list): List of company IDs to associate.
+        contact_ids (list): List of contact IDs to associate.
+
+    Returns:
+        bool: True if associations were successful, False otherwise.
     """
-    url = "https://api.hubapi.com/crm/v3/objects/companies"
-    data = {
-        "properties": {
-            "name": name
-        }
-    }
-    try:
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as e:
-        st.error(f"An error occurred while creating the company: {e}")
-        st.error(f"Response content: {e.response.text}")
-        return None
-    except Exception as e:
-        st.error(f"An unexpected error occurred while creating the company: {e}")
-        return None
+    results = run_concurrently(
+        (associate_note_with_type, note_id, 'companies', company_ids),
+        (associate_note_with_type, note_id, 'contacts', contact_ids)
+    )
+    return all(results)
 
-def create_contact(firstname, lastname, email=None):
+def batch_create_objects(object_type, properties_list):
     """
-    Creates a new contact in HubSpot with the given details.
+    Creates HubSpot objects through the CRM v3 batch create endpoint, up to 100 per call.
+
+    Parameters:
+        object_type (str): 'companies' or 'contacts'.
+        properties_list (list of dict): The properties of each object to create.
+
+    Returns:
+        list: The created objects, with their 'id' and 'properties'. The API does not keep the
+        input order. Objects from a batch that failed are missing.
     """
-    url = "https://api.hubapi.com/crm/v3/objects/contacts"
-    data = {
-        "properties": {
-            "firstname": firstname,
-            "lastname": lastname,
-        }
-    }
-    if email:
-        data["properties"]["email"] = email
-    try:
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as e:
-        st.error(f"An error occurred while creating the contact: {e}")
-        st.error(f"Response content: {e.response.text}")
-        return None
-    except Exception as e:
-        st.error(f"An unexpected error occurred while creating the contact: {e}")
-        return None
+    url = f"https://api.hubapi.com/crm/v3/objects/{object_type}/batch/create"
+    created = []
+    for start in range(0, len(properties_list), HUBSPOT_BATCH_SIZE):
+        data = {"inputs": [{"properties": properties} for properties in properties_list[start:start + HUBSPOT_BATCH_SIZE]]}
+        try:
+            response = hubspot_request('POST', url, json=data)
+            response.raise_for_status()
+            result = response.json()
+            created.extend(result.get('results', []))
+            for error in result.get('errors', []):
+                st.error(f"An error occurred while creating {object_type}: {error.get('message', error)}")
+        except requests.exceptions.HTTPError as e:
+            st.error(f"An error occurred while creating {object_type}: {e}")
+            st.error(f"Response content: {e.response.text}")
+        except Exception as e:
+            st.error(f"An unexpected error occurred while creating {object_type}: {e}")
+    return created
 
-def get_contact_by_id(contact_id):
+def create_companies_batch(names):
     """
-    Retrieves a contact's full name by ID from HubSpot.
+    Creates new companies in HubSpot with the given names in as few calls as possible.
+
+    Parameters:
+        names (list of str): The company names.
+
+    Returns:
+        dict: Company IDs keyed by name, for the companies that were created.
     """
-    url = f"https://api.hubapi.com/crm/v3/objects/contacts/{contact_id}"
-    params = {'properties': 'firstname,lastname'}
-    try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        firstname = data.get('properties', {}).get('firstname', '')
-        lastname = data.get('properties', {}).get('lastname', '')
-        full_name = f"{firstname} {lastname}".strip()
-        return full_name
-    except Exception as e:
-        st.error(f"Error fetching contact by ID: {e}")
-        return "Unknown Contact"
+    created = batch_create_objects('companies', [{"name": name} for name in names])
+    return {company['properties'].get('name'): company['id'] for company in created}
 
-def get_company_by_id(company_id):
+def create_contacts_batch(people):
     """
-    Retrieves a company's name by ID from HubSpot.
+    Creates new contacts in HubSpot with the given names in as few calls as possible.
+
+    Parameters:
+        people (list of tuple): (firstname, lastname) for each contact.
+
+    Returns:
+        dict: Contact IDs keyed by (firstname, lastname), for the contacts that were created.
     """
-    url = f"https://api.hubapi.com/crm/v3/objects/companies/{company_id}"
-    params = {'properties': 'name'}
-    try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        name = data.get('properties', {}).get('name', '')
-        return name
-    except Exception as e:
-        st.error(f"Error fetching company by ID: {e}")
-        return "Unknown Company"
+    created = batch_create_objects(
+        'contacts',
+        [{"firstname": firstname, "lastname": lastname} for firstname, lastname in people]
+    )
+    return {
+        (contact['properties'].get('firstname'), contact['properties'].get('lastname')): contact['id']
+        for contact in created
+    }
 
+@ttl_cache(GD_METADATA_CACHE_TTL)
 def gd_get_shareable_link(file_id):
     """
     Creates a shareable link for a Google Drive file.
 
+    Cached, so reruns of the page don't re-share the folder and re-read its link every time.
+
     Parameters:
         file_id (str): The ID of the file.
 
@@ -469,7 +679,7 @@ def gd_get_shareable_link(file_id):
             'type': 'anyone',
             'role': 'reader'
         }
-        drive_service.permissions().create(fileId=file_id, body=permission).execute()
+        drive_service.permissions().create(fileId=file_id, body=permission, fields='id').execute()
 
         # Get the shareable link
         file = drive_service.files().get(fileId=file_id, fields='webViewLink').execute()
@@ -491,7 +701,9 @@ st.markdown(f'[Raw Transcripts Google Drive Folder]({raw_transcripts_link})')
 if drive_link:
     # Extract the file ID from the provided link
     gd_transcript_file_id = gd_extract_file_id(drive_link)
-    if gd_transcript_file_id:
+    if not gd_transcript_file_id:
+        st.error("Invalid Google Drive or Google Docs link.")
+    else:
         gd_transcript_file_properties = gd_get_file_properties(gd_transcript_file_id)
         datetime_transcribed = gd_transcript_file_properties.get('transcription_timestamp')
         datetime_uploaded = gd_transcript_file_properties.get('upload_timestamp')
@@ -503,33 +715,14 @@ if drive_link:
         st.success("Google Drive link is valid.")
 
         # --- Fetch Companies and Contacts ---
-        # Check if companies data is already stored in session state
-        if 'companies_data' not in st.session_state:
-            # Show a spinner while fetching companies data
-            with st.spinner('Fetching companies...'):
-                st.session_state['companies_data'] = get_all_companies()
-
-        # Check if contacts data is already stored in session state
-        if 'contacts_data' not in st.session_state:
-            # Show a spinner while fetching contacts data
-            with st.spinner('Fetching contacts...'):
-                st.session_state['contacts_data'] = get_all_contacts()
-
-        # Retrieve companies and contacts data from session state
-        companies_data = st.session_state['companies_data']
-        contacts_data = st.session_state['contacts_data']
-
-        # Create a dictionary for companies with name as the key and ID as the value
-        company_options = {
-            f"{company.get('properties', {}).get('name', 'Unnamed Company')} [{company.get('id')}]": company.get('id')
-            for company in companies_data
-        }
-
-        # Create a dictionary for contacts with "firstname lastname [ID]" as the key and ID as the value
-        contact_options = {
-            f"{contact.get('properties', {}).get('firstname', '')} {contact.get('properties', {}).get('lastname', '')} [{contact.get('id')}]": contact.get('id')
-            for contact in contacts_data
-        }
+        # Both lists are cached across sessions, so only the first load after expiry hits HubSpot.
+        # Records added in HubSpot directly only show up after expiry, unless the cache is refreshed here.
+        st.button('Refresh HubSpot companies and contacts', on_click=clear_hubspot_lists)
+        with st.spinner('Fetching companies and contacts...'):
+            (
+                (company_options, company_ids_by_name),
+                (contact_options, contact_ids_by_name)
+            ) = get_company_and_contact_options()
 
         # Provide a disclaimer for duplicate names
         st.write("**Note:** If there are duplicate names in the selection lists, please refer to the contact ID in brackets to verify the correct contact in HubSpot.")
@@ -549,7 +742,7 @@ if drive_link:
         action_items = st.text_area('Enter your action items here. Be specific!')
 
         # Clean the action_items to ensure it's a single line
-        action_items_single_line = re.sub(r'\s+', ' ', action_items).strip()
+        action_items_single_line = WHITESPACE_PATTERN.sub(' ', action_items).strip()
 
         # Multiselect for selecting companies to tag in the engagement
         selected_companies = st.multiselect(
@@ -587,71 +780,81 @@ if drive_link:
             contact_ids = []
             recorder_contact_ids = []
 
-            # Create new HubSpot companies
-            if new_companies_input.strip():
-                new_company_names = [name.strip() for name in new_companies_input.strip().split('\n') if name.strip()]
-                for company_name in new_company_names:
-                    # Check if the company already exists (to avoid duplicates)
-                    existing_companies = [key for key in company_options.keys() if key.startswith(company_name)]
-                    if not existing_companies:
-                        st.info(f"Creating new company: {company_name}")
-                        company_response = create_company(company_name)
-                        if company_response and 'id' in company_response:
-                            company_id = company_response['id']
-                            new_company_ids.append(company_id)
-                            # Update the company_options dictionary
-                            company_options[f"{company_name} [{company_id}]"] = company_id
-                            # Append to companies_created_formatted
-                            companies_created_formatted.append(f"{company_name} [{company_id}]")
-                        else:
-                            st.error(f"Failed to create company: {company_name}")
-                    else:
-                        st.warning(f"Company '{company_name}' already exists in HubSpot.")
-                        company_id = company_options[existing_companies[0]]
-                        new_company_ids.append(company_id)
-                        # Append to companies_created_formatted (even if it exists)
-                        companies_created_formatted.append(f"{company_name} [{company_id}]")
-            else:
-                new_company_names = []
-
-            # Create new HubSpot contacts
-            if new_contacts_input.strip():
-                new_contact_names = [name.strip() for name in new_contacts_input.strip().split('\n') if name.strip()]
-                for contact_name in new_contact_names:
-                    # Normalize whitespace within the name
-                    contact_name = ' '.join(contact_name.split())
-                    # Split the name into parts
-                    names = contact_name.split()
-                    if len(names) >= 2:
-                        # Assign all but the last word to the first name
-                        firstname = ' '.join(names[:-1])
-                        # The last word is the last name
-                        lastname = names[-1]
-                        full_name = f"{firstname} {lastname}"
-                        # Check for existing contacts with the same name
-                        existing_contacts = [key for key in contact_options.keys() if key.startswith(full_name)]
-                        if not existing_contacts:
-                            st.info(f"Creating new contact: {full_name}")
-                            contact_response = create_contact(firstname, lastname)
-                            if contact_response and 'id' in contact_response:
-                                contact_id = contact_response['id']
-                                new_contact_ids.append(contact_id)
-                                # Update the contact_options dictionary
-                                contact_options[f"{full_name} [{contact_id}]"] = contact_id
-                                # Append to contacts_created_formatted
-                                contacts_created_formatted.append(f"{full_name} [{contact_id}]")
-                            else:
-                                st.error(f"Failed to create contact: {full_name}")
-                        else:
-                            st.warning(f"Contact '{full_name}' already exists in HubSpot.")
-                            contact_id = contact_options[existing_contacts[0]]
-                            new_contact_ids.append(contact_id)
-                            # Append to contacts_created_formatted (even if it exists)
-                            contacts_created_formatted.append(f"{full_name} [{contact_id}]")
-                    else:
-                        st.error(f"Invalid contact name format: '{contact_name}'. Each contact must include at least a first name and a last name, separated by spaces.")
-            else:
-                new_contact_names = []
+            # Check which new companies already exist (to avoid duplicates); the rest are created below
+            new_company_names = [name.strip() for name in new_companies_input.strip().split('\n') if name.strip()]
+            existing_company_ids = {}
+            companies_to_create = []
+            for company_name in new_company_names:
+                existing_company_id = company_ids_by_name.get(normalize_name(company_name))
+                if existing_company_id:
+                    existing_company_ids[company_name] = existing_company_id
+                elif company_name not in companies_to_create:
+                    companies_to_create.append(company_name)
+
+            # Parse the new contact names and check which contacts already exist; the rest are created below
+            new_contact_names = [name.strip() for name in new_contacts_input.strip().split('\n') if name.strip()]
+            parsed_contacts = []
+            existing_contact_ids = {}
+            contacts_to_create = []
+            for contact_name in new_contact_names:
+                # Normalize whitespace within the name
+                contact_name = ' '.join(contact_name.split())
+                # Split the name into parts
+                names = contact_name.split()
+                if len(names) < 2:
+                    st.error(f"Invalid contact name format: '{contact_name}'. Each contact must include at least a first name and a last name, separated by spaces.")
+                    continue
+                # Assign all but the last word to the first name; the last word is the last name
+                person = (' '.join(names[:-1]), names[-1])
+                full_name = f"{person[0]} {person[1]}"
+                parsed_contacts.append((person, full_name))
+                # Check for existing contacts with the same name
+                existing_contact_id = contact_ids_by_name.get(normalize_name(full_name))
+                if existing_contact_id:
+                    existing_contact_ids[person] = existing_contact_id
+                elif person not in contacts_to_create:
+                    contacts_to_create.append(person)
+
+            # Create the new companies and contacts in HubSpot; the two batches are sent at the same time
+            if companies_to_create:
+                st.info(f"Creating new companies: {', '.join(companies_to_create)}")
+            if contacts_to_create:
+                st.info(f"Creating new contacts: {', '.join(f'{firstname} {lastname}' for firstname, lastname in contacts_to_create)}")
+            created_company_ids, created_contact_ids = run_concurrently(
+                (create_companies_batch, companies_to_create),
+                (create_contacts_batch, contacts_to_create)
+            )
+            # Drop the shared lists so the next load includes the new records
+            if created_company_ids:
+                clear_company_cache()
+            if created_contact_ids:
+                clear_contact_cache()
+
+            for company_name in new_company_names:
+                if company_name in existing_company_ids:
+                    st.warning(f"Company '{company_name}' already exists in HubSpot.")
+                    company_id = existing_company_ids[company_name]
+                elif company_name in created_company_ids:
+                    company_id = created_company_ids[company_name]
+                else:
+                    st.error(f"Failed to create company: {company_name}")
+                    continue
+                new_company_ids.append(company_id)
+                # Append to companies_created_formatted (even if it exists)
+                companies_created_formatted.append(f"{company_name} [{company_id}]")
+
+            for person, full_name in parsed_contacts:
+                if person in existing_contact_ids:
+                    st.warning(f"Contact '{full_name}' already exists in HubSpot.")
+                    contact_id = existing_contact_ids[person]
+                elif person in created_contact_ids:
+                    contact_id = created_contact_ids[person]
+                else:
+                    st.error(f"Failed to create contact: {full_name}")
+                    continue
+                new_contact_ids.append(contact_id)
+                # Append to contacts_created_formatted (even if it exists)
+                contacts_created_formatted.append(f"{full_name} [{contact_id}]")
 
             # Map selected company names to their corresponding IDs
             company_ids = [company_options[name] for name in selected_companies]
@@ -667,9 +870,9 @@ if drive_link:
             company_ids.extend(new_company_ids)
             contact_ids.extend(new_contact_ids)
 
-            # Remove duplicates
-            company_ids = list(set(company_ids))
-            contact_ids = list(set(contact_ids))
+            # Remove duplicates, keeping the order the entities were selected in
+            company_ids = list(dict.fromkeys(company_ids))
+            contact_ids = list(dict.fromkeys(contact_ids))
 
             # --- SHEETS LOG ---
             # Get the current datetime for datetime_tagged in the desired format
@@ -685,13 +888,13 @@ if drive_link:
             if who_recorded_formatted and who_recorded_formatted not in contacts_linked_formatted:
                 contacts_linked_formatted.append(who_recorded_formatted)
 
-            # Remove duplicates
-            contacts_linked_formatted = list(set(contacts_linked_formatted))
+            # Remove duplicates, keeping the order the entities were selected in
+            contacts_linked_formatted = list(dict.fromkeys(contacts_linked_formatted))
 
             # Prepare companies_linked_formatted
             companies_linked_formatted = selected_companies.copy()
-            # Remove duplicates
-            companies_linked_formatted = list(set(companies_linked_formatted))
+            # Remove duplicates, keeping the order the entities were selected in
+            companies_linked_formatted = list(dict.fromkeys(companies_linked_formatted))
 
             # Ensure that contacts_created_formatted and companies_created_formatted are defined
             contacts_created_formatted = contacts_created_formatted if contacts_created_formatted else []
@@ -717,11 +920,13 @@ if drive_link:
 
             try:
                 # Append the row to the spreadsheet
-                request = sheets_service.spreadsheets().values().append(
+                request = get_sheets_service().spreadsheets().values().append(
                     spreadsheetId=GD_SPREADSHEET_ID_INGRESS_LOG,
                     range=f'{GD_SHEET_NAME_INGRESS_LOG}!A:J',  # Include column J
                     valueInputOption='RAW',
                     insertDataOption='INSERT_ROWS',
+                    includeValuesInResponse=False,
+                    fields='spreadsheetId',  # The response isn't used, so skip the echoed update details
                     body={'values': [row]}
                 )
                 response = request.execute()
@@ -741,20 +946,24 @@ if drive_link:
                 'file_title': transcript_title,
             }
 
-            gd_update_file_properties(gd_transcript_file_id, new_properties)
-            test_metadata = gd_get_file_properties(gd_transcript_file_id)
-            st.success(f"File metadata updated.")
-            st.write(f"Metadata: {test_metadata}")
-
-            # Rename file and move to processed gd folder
+            # Rename file and move to processed gd folder in the same update
+            new_file_name = None
             if who_recorded:
                 recorder_name = who_recorded[0].split(' [')[0].upper()
                 new_file_name = f"SIGNAL_{datetime_uploaded}_{recorder_name}_{transcript_title.upper()}_TRANSCRIPT__TAGGED.docx"
-                gd_rename_file(gd_transcript_file_id, new_file_name)
 
-            gd_move_file_between_folders(gd_transcript_file_id, GD_FOLDER_ID_TAGGED_TEXT)
-            st.success(f"File moved to processed folder.")
-            st.write(f"Folder ID: {GD_FOLDER_ID_TAGGED_TEXT}")
+            updated_file = gd_finalize_file(
+                gd_transcript_file_id,
+                new_name=new_file_name,
+                target_folder_id=GD_FOLDER_ID_TAGGED_TEXT,
+                new_properties=new_properties,
+                known_keys=TRANSCRIPT_PROPERTY_KEYS
+            )
+            if updated_file:
+                st.success(f"File metadata updated.")
+                st.write(f"Metadata: {updated_file.get('properties', {})}")
+                st.success(f"File moved to processed folder.")
+                st.write(f"Folder ID: {GD_FOLDER_ID_TAGGED_TEXT}")
 
             # --- HUBSPOT DATA WRITE ---
             action_items_html = action_items.replace('\n','<br>')
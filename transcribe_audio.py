@@ -23,11 +23,18 @@ Deployed on Streamlit Cloud.
 
 # Standard python library imports
 import os
-import io
 import re
 import json
+import time
+import random
 import shutil
+import tempfile
+import threading
+import functools
 from datetime import datetime
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 
 # Open source imports
 import streamlit as st
@@ -39,6 +46,7 @@ from moviepy.editor import VideoFileClip
 from openai import OpenAI
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
 
 # Define OpenAI scopes/credentials, initialize client
@@ -51,14 +59,30 @@ SCOPES = [
     'https://www.googleapis.com/auth/documents',
     'https://www.googleapis.com/auth/spreadsheets'
 ]
-gcp_secrets = st.secrets["gcp_service_account"]
-creds = service_account.Credentials.from_service_account_info(
-    gcp_secrets,
-    scopes=SCOPES
-)
-drive_service = build('drive', 'v3', credentials=creds)
-docs_service = build('docs', 'v1', credentials=creds)
-sheets_service = build('sheets', 'v4', credentials=creds)
+
+@st.cache_resource
+def get_google_credentials():
+    """
+    Loads the Google service account credentials once per process.
+
+    Streamlit re-executes this script on every interaction. Caching the credentials object
+    also caches its OAuth access token, so reruns skip the key parse and token request.
+    The API clients themselves are not cached: their httplib2 transport is not thread-safe
+    and Streamlit runs concurrent sessions on separate threads.
+
+    Returns:
+        google.oauth2.service_account.Credentials: The service account credentials.
+    """
+    return service_account.Credentials.from_service_account_info(
+        st.secrets["gcp_service_account"],
+        scopes=SCOPES
+    )
+
+# Clients are built from the discovery documents bundled with googleapiclient (no network fetch)
+creds = get_google_credentials()
+drive_service = build('drive', 'v3', credentials=creds, cache_discovery=False, static_discovery=True)
+docs_service = build('docs', 'v1', credentials=creds, cache_discovery=False, static_discovery=True)
+sheets_service = build('sheets', 'v4', credentials=creds, cache_discovery=False, static_discovery=True)
 
 # Define Google Drive folder and spreadsheet IDs
 #PRODUCTION IDs
@@ -77,6 +101,34 @@ GD_SHEET_NAME_INGRESS_LOG = 'transcribe_audio'
 # GD_SPREADSHEET_ID_INGRESS_LOG = st.secrets["gdrive"]["GD_SPREADSHEET_ID_INGRESS_LOG_TEST"]
 # GD_SHEET_NAME_INGRESS_LOG = 'transcribe_audio'
 
+# Define Google Drive API request limits
+GD_BATCH_SIZE = 25  # Requests packed into one batch call
+GD_MAX_RETRIES = 5  # Retries for rate-limited (429) and transient (5xx) failures
+GD_RETRY_STATUSES = (429, 500, 502, 503, 504)
+GD_LIST_PARENTS_PER_QUERY = 50  # Folder IDs combined into one files.list query
+GD_DOWNLOAD_MAX_WORKERS = 8  # Concurrent media downloads, kept under the per-user QPS quota
+GD_DOWNLOAD_CHUNK_SIZE = 16 * 1024 * 1024  # Bytes requested per download chunk
+GD_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # Resumable upload chunk size (multiple of 256 KiB)
+
+# MIME types of the files this pipeline uploads, keyed by lowercase extension
+MIME_TYPES_BY_EXTENSION = {
+    '.mp3': 'audio/mpeg',
+    '.wav': 'audio/wav',
+    '.m4a': 'audio/mp4',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+}
+
+# Audio and video formats picked up from the unprocessed folder (matched exactly by the Drive query)
+ACCEPTED_MIME_TYPES = [
+    'audio/mpeg', 'audio/mp3', 'audio/wav', 'audio/x-wav', 'audio/wave',
+    'audio/mp4', 'audio/m4a', 'audio/x-m4a', 'audio/aac', 'audio/ogg', 'audio/webm',
+    'audio/flac', 'audio/x-flac', 'audio/amr', 'audio/3gpp',
+    'video/mp4', 'video/quicktime', 'video/webm', 'video/3gpp', 'video/x-msvideo', 'video/x-matroska'
+]
+
+# Per-thread Google Drive clients for parallel downloads
+gd_thread_local = threading.local()
+
 # Define functions that interact with local repo
 
 def convert_to_mp3(input_file, mime_type):
@@ -181,41 +233,162 @@ def rename_file(input_file_path, new_file_name):
 
 # Define functions that interact with Google Docs + Drive
 
-def gd_get_file_creation_date(file_id):
+def gd_is_retryable(error):
     """
-    Retrieves the original upload date (creation date) of a file from Google Drive.
+    Checks whether a Google API error is a rate limit or transient server failure.
+
+    Drive reports per-user rate limiting either as a 429 or as a 403 with a
+    rateLimitExceeded / userRateLimitExceeded reason.
 
     Parameters:
-        file_id (str): The ID of the file.
+        error (Exception): The error raised by the request.
 
     Returns:
-        str: The creation date and time in ISO 8601 format (e.g., '2023-11-04T12:34:56.789Z').
+        bool: True if the request should be retried.
+    """
+    if not isinstance(error, HttpError):
+        return False
+    if error.resp.status in GD_RETRY_STATUSES:
+        return True
+    return error.resp.status == 403 and b'ateLimitExceeded' in (error.content or b'')
 
-    Raises:
-        Exception: If there is an error retrieving the creation date.
+
+def gd_retry_delay(error, attempt):
     """
-    try:
-        file = drive_service.files().get(fileId=file_id, fields='createdTime').execute()
-        created_time = file.get('createdTime')
-        return created_time
-    except Exception as e:
-        print(f"Error retrieving creation date for file {file_id}: {str(e)}")
-        return None
+    Returns how long to wait before retrying a failed Google API request.
+
+    Uses the server's Retry-After header when present, otherwise exponential backoff,
+    plus up to one second of random jitter.
+
+    Parameters:
+        error (HttpError): The error raised by the request.
+        attempt (int): The number of retries already made.
+
+    Returns:
+        float: The delay in seconds.
+    """
+    retry_after = error.resp.get('retry-after', '')
+    delay = int(retry_after) if retry_after.isdigit() else 2 ** attempt
+    return delay + random.random()
 
-def gd_list_audio_video_files(folder_id):
+
+def drive_retry(function):
     """
-    Lists all audio and video files in a Google Drive folder.
+    Retries a Google API call on rate limiting and transient server errors.
+
+    Sleeps for gd_retry_delay between attempts and re-raises after GD_MAX_RETRIES retries,
+    so a 429 costs a short wait instead of failing the whole pipeline run.
 
     Parameters:
-        folder_id (str): The ID of the Google Drive folder.
+        function (function): The function that issues the request.
 
     Returns:
-        list: A list of files with their 'id', 'name', and 'mimeType'.
+        function: The wrapped function.
     """
-    query = f"'{folder_id}' in parents and (mimeType contains 'audio/' or mimeType contains 'video/')"
-    results = drive_service.files().list(q=query, fields="files(id, name, mimeType)").execute()
-    files = results.get('files', [])
-    return files
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        for attempt in range(GD_MAX_RETRIES + 1):
+            try:
+                return function(*args, **kwargs)
+            except HttpError as e:
+                if attempt == GD_MAX_RETRIES or not gd_is_retryable(e):
+                    raise
+                time.sleep(gd_retry_delay(e, attempt))
+    return wrapper
+
+
+@drive_retry
+def gd_execute(request):
+    """
+    Executes a Google API request or batch request, retrying rate-limited and transient failures.
+
+    Parameters:
+        request: The googleapiclient HttpRequest or BatchHttpRequest to execute.
+
+    Returns:
+        The response of the request.
+    """
+    return request.execute()
+
+def gd_get_thread_drive_service():
+    """
+    Returns a Google Drive service owned by the calling thread.
+
+    The httplib2 connection inside a googleapiclient service is not thread-safe, so each
+    worker thread lazily builds and reuses its own client.
+
+    Returns:
+        googleapiclient.discovery.Resource: The Google Drive service for this thread.
+    """
+    if not hasattr(gd_thread_local, 'drive_service'):
+        gd_thread_local.drive_service = build(
+            'drive', 'v3', credentials=creds, cache_discovery=False, static_discovery=True
+        )
+    return gd_thread_local.drive_service
+
+def gd_iter_audio_video_files(folder_ids, page_size=1000):
+    """
+    Yields the audio and video files in one or more Google Drive folders as each page arrives.
+
+    Folders are queried in groups of GD_LIST_PARENTS_PER_QUERY using a combined
+    'in parents' clause. Only files whose MIME type is in ACCEPTED_MIME_TYPES are
+    returned. Callers can start work on the first page while later pages are fetched.
+
+    Parameters:
+        folder_ids (list or str): The IDs of the Google Drive folders, or a single folder ID.
+        page_size (int): The number of files requested per page.
+
+    Yields:
+        dict: A file with its 'id', 'name', 'mimeType', and 'createdTime'.
+    """
+    if isinstance(folder_ids, str):
+        folder_ids = [folder_ids]
+
+    for start in range(0, len(folder_ids), GD_LIST_PARENTS_PER_QUERY):
+        chunk = folder_ids[start:start + GD_LIST_PARENTS_PER_QUERY]
+        parents_clause = " or ".join(f"'{folder_id}' in parents" for folder_id in chunk)
+        mime_clause = " or ".join(f"mimeType = '{mime_type}'" for mime_type in ACCEPTED_MIME_TYPES)
+        query = f"({parents_clause}) and ({mime_clause}) and trashed = false"
+
+        page_token = None
+        while True:
+            results = gd_execute(drive_service.files().list(
+                q=query,
+                fields="nextPageToken, files(id, name, mimeType, createdTime)",
+                pageSize=page_size,
+                spaces='drive',
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
+                pageToken=page_token
+            ))
+            yield from results.get('files', [])
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+
+
+def gd_download_file_to_sink(file_id, sink, chunksize=GD_DOWNLOAD_CHUNK_SIZE):
+    """
+    Streams a file from Google Drive into a writable binary stream.
+
+    The sink can be an open file, an io.BytesIO, a tempfile.SpooledTemporaryFile or the stdin
+    of a subprocess, so callers that don't need the bytes on disk can skip the file entirely.
+
+    Parameters:
+        file_id (str): The ID of the file to download.
+        sink (BinaryIO): The stream the downloaded bytes are written to.
+        chunksize (int): The number of bytes requested per chunk.
+
+    Returns:
+        BinaryIO: The sink, after the whole file has been written to it.
+    """
+    request = gd_get_thread_drive_service().files().get_media(fileId=file_id, supportsAllDrives=True)
+    downloader = MediaIoBaseDownload(sink, request, chunksize=chunksize)
+    done = False
+    while not done:
+        status, done = downloader.next_chunk(num_retries=GD_MAX_RETRIES)
+        print(f"Download {file_id}: {int(status.progress() * 100)}%.")
+    return sink
 
 
 def gd_download_file(file_id, file_name):
@@ -229,57 +402,117 @@ def gd_download_file(file_id, file_name):
     Returns:
         str: The local path to the downloaded file.
     """
-    request = drive_service.files().get_media(fileId=file_id)
-    fh = io.FileIO(file_name, 'wb')
-    downloader = MediaIoBaseDownload(fh, request)
-    done = False
-    while not done:
-        status, done = downloader.next_chunk()
-        print(f"Download {file_name}: {int(status.progress() * 100)}%.")
+    with open(file_name, 'wb') as fh:
+        gd_download_file_to_sink(file_id, fh)
     return file_name
 
 
-def gd_upload_file(file_path, folder_id, mime_type):
+def remove_local_file(file_path):
+    """
+    Deletes a local file if it exists.
+
+    Parameters:
+        file_path (str): The local path to the file.
+    """
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+
+def gd_download_files_ahead(files, download_dir, max_ahead=GD_DOWNLOAD_MAX_WORKERS):
+    """
+    Downloads files from Google Drive in the background, at most max_ahead files ahead of the caller.
+
+    Each file is saved in download_dir under its file ID (plus its original extension), so
+    uploads that share a name never write to the same path. The files are handed out in
+    order, each once its download has finished, and deleted when the caller moves on.
+
+    When the iteration ends, whether it finished, raised or was abandoned, downloads that
+    have not started are cancelled, and every file still on disk (including the last one
+    handed out) is deleted once nothing is writing it.
+
+    Parameters:
+        files (iterable): The files to download, each with an 'id' and a 'name'. Read only as the
+            window needs more files, so a generator such as gd_iter_audio_video_files is listed lazily.
+        download_dir (str): The local directory the files are saved in.
+        max_ahead (int): The maximum number of files downloaded ahead, and of concurrent downloads.
+
+    Yields:
+        tuple: The file and the local path to its downloaded copy.
+    """
+    executor = ThreadPoolExecutor(max_workers=max_ahead)
+    pending = deque()
+    remaining = iter(files)
+    current_path = None
+
+    def submit(file):
+        extension = os.path.splitext(file['name'])[1]
+        local_path = os.path.join(download_dir, f"{file['id']}{extension}")
+        pending.append((file, local_path, executor.submit(gd_download_file, file['id'], local_path)))
+
+    try:
+        for file in islice(remaining, max_ahead):
+            submit(file)
+        while pending:
+            file, current_path, future = pending.popleft()
+            # Keep the window full: start the next download before waiting on this one
+            next_file = next(remaining, None)
+            if next_file is not None:
+                submit(next_file)
+            future.result()
+            yield file, current_path
+            remove_local_file(current_path)
+            current_path = None
+    finally:
+        if current_path:
+            remove_local_file(current_path)
+        for _, local_path, future in pending:
+            if future.cancel():
+                continue
+            # Already running or done: delete the file once the download stops writing it
+            future.add_done_callback(lambda _, path=local_path: remove_local_file(path))
+        executor.shutdown(wait=False)
+
+
+def gd_upload_file(file_path, folder_id, mime_type=None, name=None):
     """
     Uploads a file to a specified Google Drive folder.
 
+    Uses a resumable upload sent in GD_UPLOAD_CHUNK_SIZE chunks, so a failed chunk is
+    retried on its own (with googleapiclient's exponential backoff on 429/5xx) instead
+    of restarting the whole upload.
+
     Parameters:
         file_path (str): The local path to the file to upload.
         folder_id (str): The ID of the destination Google Drive folder.
-        mime_type (str): The MIME type of the file.
+        mime_type (str, optional): The MIME type of the file. Looked up from the file extension if omitted.
+        name (str, optional): The file name in Google Drive. Defaults to the local file name.
 
     Returns:
         str: The ID of the uploaded file in Google Drive.
     """
+    if mime_type is None:
+        mime_type = MIME_TYPES_BY_EXTENSION[os.path.splitext(file_path)[1].lower()]
+    if name is None:
+        name = os.path.basename(file_path)
+
     file_metadata = {
-        'name': os.path.basename(file_path),
+        'name': name,
         'parents': [folder_id]
     }
 
-    media = MediaFileUpload(file_path, mimetype=mime_type)
-    uploaded_file = drive_service.files().create(
+    media = MediaFileUpload(file_path, mimetype=mime_type, resumable=True, chunksize=GD_UPLOAD_CHUNK_SIZE)
+    request = drive_service.files().create(
         body=file_metadata,
         media_body=media,
-        fields='id'
-    ).execute()
+        fields='id',
+        supportsAllDrives=True
+    )
+    uploaded_file = None
+    while uploaded_file is None:
+        status, uploaded_file = request.next_chunk(num_retries=GD_MAX_RETRIES)
     return uploaded_file.get('id')
 
 
-def gd_get_file_properties(file_id):
-    """
-    Retrieves the properties of a file from Google Drive.
-
-    Parameters:
-        file_id (str): The ID of the file.
-
-    Returns:
-        dict: A dictionary containing the file's properties.
-    """
-    file = drive_service.files().get(fileId=file_id, fields='properties').execute()
-    properties = file.get('properties', {})
-    return properties
-
-
 def gd_update_file_properties(file_id, new_properties):
     """
     Updates the properties of a file in Google Drive.
@@ -294,11 +527,12 @@ def gd_update_file_properties(file_id, new_properties):
     file_metadata = {
         'properties': new_properties
     }
-    updated_file = drive_service.files().update(
+    updated_file = gd_execute(drive_service.files().update(
         fileId=file_id,
         body=file_metadata,
-        fields='id, properties'
-    ).execute()
+        fields='id, properties',
+        supportsAllDrives=True
+    ))
     return updated_file
 
 def gd_move_file_between_folders(file_id, target_folder_id):
@@ -314,16 +548,17 @@ def gd_move_file_between_folders(file_id, target_folder_id):
     """
     try:
         # Retrieve the existing parents to remove
-        file = drive_service.files().get(fileId=file_id, fields='parents').execute()
+        file = gd_execute(drive_service.files().get(fileId=file_id, fields='parents', supportsAllDrives=True))
         previous_parents = ",".join(file.get('parents'))
 
         # Move the file to the new folder
-        drive_service.files().update(
+        gd_execute(drive_service.files().update(
             fileId=file_id,
             addParents=target_folder_id,
             removeParents=previous_parents,
-            fields='id, parents'
-        ).execute()
+            fields='id',
+            supportsAllDrives=True
+        ))
 
         print(f"File ID {file_id} moved to folder ID {target_folder_id}")
     except Exception as e:
@@ -340,20 +575,89 @@ def gd_get_shareable_link(file_id):
     Returns:
         str: The shareable link to the file.
     """
-    try:
-        # Update file permissions to make it shareable
-        permission = {
-            'type': 'anyone',
-            'role': 'reader'
-        }
-        drive_service.permissions().create(fileId=file_id, body=permission).execute()
-
-        # Get the shareable link
-        file = drive_service.files().get(fileId=file_id, fields='webViewLink').execute()
-        return file.get('webViewLink')
-    except Exception as e:
-        print(f"Error getting shareable link for file {file_id}: {str(e)}")
-        return None
+    return gd_get_shareable_links_bulk([file_id]).get(file_id)
+
+
+def gd_get_shareable_links_bulk(file_ids, batch_size=GD_BATCH_SIZE):
+    """
+    Creates shareable links for many Google Drive files using batch requests.
+
+    Each file's permission update and webViewLink lookup travel in the same multipart/mixed
+    request, so up to batch_size files cost a single round-trip.
+
+    Parameters:
+        file_ids (list): The IDs of the files.
+        batch_size (int): The maximum number of files handled per batch request.
+
+    Returns:
+        dict: The shareable links keyed by file ID, or None for files that failed.
+    """
+    # Update file permissions to make them shareable
+    permission = {
+        'type': 'anyone',
+        'role': 'reader'
+    }
+    links = {}
+
+    for start in range(0, len(file_ids), batch_size):
+        chunk = file_ids[start:start + batch_size]
+        failed_file_ids = set()
+
+        def callback(request_id, response, exception):
+            request_type, index = request_id.split('-')
+            file_id = chunk[int(index)]
+            if exception is not None:
+                print(f"Error getting shareable link for file {file_id}: {str(exception)}")
+                failed_file_ids.add(file_id)
+            elif request_type == 'link':
+                links[file_id] = response.get('webViewLink')
+
+        batch = drive_service.new_batch_http_request(callback=callback)
+        for index, file_id in enumerate(chunk):
+            batch.add(
+                drive_service.permissions().create(fileId=file_id, body=permission, fields='id', supportsAllDrives=True),
+                request_id=f"permission-{index}"
+            )
+            # Get the shareable link
+            batch.add(
+                drive_service.files().get(fileId=file_id, fields='webViewLink', supportsAllDrives=True),
+                request_id=f"link-{index}"
+            )
+        try:
+            gd_execute(batch)
+        except Exception as e:
+            print(f"Error getting shareable links for {len(chunk)} file(s): {str(e)}")
+            failed_file_ids.update(chunk)
+
+        for file_id in failed_file_ids:
+            links[file_id] = None
+
+    return links
+
+
+def gd_iter_shared_files(files, batch_size=GD_BATCH_SIZE):
+    """
+    Shares files as they are read from an iterable, batch_size files per batch request.
+
+    Each file's shareable link is stored on it as 'webViewLink' (None if sharing failed), so a
+    folder listing can be passed through without waiting for its last page.
+
+    Parameters:
+        files (iterable): The files to share, each with an 'id'.
+        batch_size (int): The maximum number of files shared per batch request.
+
+    Yields:
+        dict: Each file, with its 'webViewLink' set.
+    """
+    files = iter(files)
+    while True:
+        chunk = list(islice(files, batch_size))
+        if not chunk:
+            return
+        links = gd_get_shareable_links_bulk([file['id'] for file in chunk], batch_size)
+        for file in chunk:
+            file['webViewLink'] = links.get(file['id'])
+            yield file
 
 # Define functions that leverage OpenAI API
 
@@ -420,19 +724,23 @@ st.markdown('[Notion](https://www.notion.so/Pulse-4799295f90594380b55f75e0d78dbb
 if st.button('Transcribe Audio Files'):
     st.write("Transcription started...")
     processed_files_count = 0
+    download_dir = tempfile.mkdtemp(prefix='nos_transcribe_')
+    gd_audio_downloads = None
     try:
-        gd_audio_files = gd_list_audio_video_files(GD_FOLDER_ID_UNPROCESSED_AUDIO)
-        gd_file_count = len(gd_audio_files)
-        st.write(f"Found {gd_file_count} audio files to transcribe.")
+        # Share the input files in batched requests as the listing pages arrive, without
+        # waiting for the whole folder to be listed
+        gd_audio_files = gd_iter_shared_files(gd_iter_audio_video_files([GD_FOLDER_ID_UNPROCESSED_AUDIO]))
 
-        for file in gd_audio_files:
+        # Download the next few files in the background while the current one is processed
+        gd_audio_downloads = gd_download_files_ahead(gd_audio_files, download_dir)
+        for file, input_audio_local_path in gd_audio_downloads:
             gd_input_audio_file_id = file['id']
             gd_input_audio_file_name = file['name']  # Original file name
             gd_input_audio_file_mimeType = file['mimeType']
-            gd_input_audio_file_link = gd_get_shareable_link(gd_input_audio_file_id)
+            gd_input_audio_file_link = file['webViewLink']
 
-            # Get the original upload date
-            gd_input_audio_file_createdTime = gd_get_file_creation_date(gd_input_audio_file_id)
+            # Get the original upload date (returned with the folder listing)
+            gd_input_audio_file_createdTime = file.get('createdTime')
 
             # Convert to formatted date/time string
             if gd_input_audio_file_createdTime:
@@ -449,8 +757,7 @@ if st.button('Transcribe Audio Files'):
             st.write(f"Starting file {processed_files_count}.")
             st.write(f"Filename: {gd_input_audio_file_name}")
 
-            # Download the original file to local repo (before any conversion)
-            input_audio_local_path = gd_download_file(gd_input_audio_file_id, gd_input_audio_file_name)
+            # The original file was downloaded to local repo above (before any conversion)
             st.write(f"Downloaded file: {gd_input_audio_file_name} with MIME type: {gd_input_audio_file_mimeType}")
 
             # Convert the input file to MP3 with the same name. Delete the input file
@@ -467,7 +774,7 @@ if st.button('Transcribe Audio Files'):
             st.write(f"Renamed {output_mp3_local_path} to {gd_output_mp3_file_name}")
 
             # Upload mp3 file to Google Drive
-            gd_output_mp3_file_id = gd_upload_file(renamed_mp3_local_path, GD_FOLDER_ID_TRANSCRIBED_AUDIO,mime_type='audio/mpeg')
+            gd_output_mp3_file_id = gd_upload_file(renamed_mp3_local_path, GD_FOLDER_ID_TRANSCRIBED_AUDIO, name=gd_output_mp3_file_name)
             st.write(f".mp3 file uploaded to Google Drive with ID: {gd_output_mp3_file_id}")
 
             # Transcribe the audio
@@ -517,11 +824,7 @@ if st.button('Transcribe Audio Files'):
 
             # Upload the docx
             if os.path.exists(gd_transcript_file_name):
-                gd_transcript_file_id = gd_upload_file(
-                    gd_transcript_file_name,
-                    GD_FOLDER_ID_TRANSCRIBED_TEXT,
-                    mime_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-                )
+                gd_transcript_file_id = gd_upload_file(gd_transcript_file_name, GD_FOLDER_ID_TRANSCRIBED_TEXT)
                 st.write(f"Transcript .docx uploaded to Google Drive with ID: {gd_transcript_file_id}")
 
                 # Update the file's properties directly
@@ -599,6 +902,11 @@ if st.button('Transcribe Audio Files'):
 
     except Exception as e:
         st.error(f"Error during transcription: {str(e)}")
+    finally:
+        # Also runs when Streamlit stops or reruns the script: cancel the downloads ahead and drop their files
+        if gd_audio_downloads is not None:
+            gd_audio_downloads.close()
+        shutil.rmtree(download_dir, ignore_errors=True)
 
     st.success(f"{processed_files_count} transcription(s) complete! Find files in the folder linked below.")
     st.markdown('[Transcriptions Folder](https://drive.google.com/drive/u/0/folders/1HVT-YrVNnMy4ag0h6hqawl2PVef-Fc0C)')